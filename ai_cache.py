@@ -0,0 +1,96 @@
+"""Disk-backed LRU cache for AI analysis results.
+
+Entries are small JSON files named after a SHA-256 key of everything that
+feeds the prompt, so an identical "Analyze Market" click (from any session
+or process sharing the directory) is answered from disk without an API call.
+Entries expire after a TTL and the least recently used ones are evicted once
+the cache holds more than ``max_entries``.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class AnalysisCache:
+    """TTL + size-bounded LRU cache of analysis text on disk"""
+
+    def __init__(self, root, ttl=900, max_entries=256):
+        self.root = root
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def make_key(symbol, timeframe, analysis_types, *fingerprint):
+        """Hash the request and the prompt inputs into a cache key"""
+        payload = json.dumps([symbol, timeframe, sorted(analysis_types), *fingerprint],
+                             default=str, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached value for ``key`` or ``None``"""
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if time.time() - entry.get("created", 0) > self.ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # The file's mtime doubles as the LRU timestamp
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return entry["value"]
+
+    def put(self, key, value):
+        """Store ``value`` and evict the least recently used entries"""
+        tmp = os.path.join(self.root, f".{key}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"created": time.time(), "value": value}, f)
+        os.replace(tmp, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            try:
+                entries.append((os.path.getmtime(os.path.join(self.root, name)), name))
+            except OSError:
+                continue
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, name in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
+
+    def stats(self):
+        """Hit/miss counters for this process and the number of stored entries"""
+        entries = sum(1 for name in os.listdir(self.root) if name.endswith(".json"))
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
@@ -0,0 +1,82 @@
+"""Shared health tracking and circuit breaker for the OpenAI client.
+
+Real requests report their outcome to a :class:`CircuitBreaker`.  After
+``failure_threshold`` consecutive failures the circuit opens and callers go
+straight to the local fallback instead of waiting on a dead API.  Once
+``reset_timeout`` seconds have passed, a single probe runs on a background
+thread (half-open); only when it succeeds does traffic resume.  On the happy
+path nothing extra sits on the critical path.
+"""
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the circuit is open"""
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker with background half-open probes"""
+
+    def __init__(self, probe, failure_threshold=3, reset_timeout=60, history=50):
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.last_error = None
+        # Recent (timestamp, succeeded) outcomes, for reporting
+        self.recent = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Return True if a real request may be sent now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                threading.Thread(target=self._run_probe, name="openai-health-probe",
+                                 daemon=True).start()
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.recent.append((time.time(), True))
+            self.consecutive_failures = 0
+            self.state = CLOSED
+            self.opened_at = None
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.recent.append((time.time(), False))
+            self.last_error = None if error is None else str(error)
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def _run_probe(self):
+        try:
+            self.probe()
+        except Exception as e:
+            self.record_failure(e)
+        else:
+            self.record_success()
+
+    def stats(self):
+        with self._lock:
+            outcomes = [ok for _, ok in self.recent]
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "recent_successes": sum(outcomes),
+                "recent_failures": len(outcomes) - sum(outcomes),
+                "last_error": self.last_error,
+            }
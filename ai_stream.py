@@ -0,0 +1,84 @@
+"""Streamed chat completions with time-to-first-token measurement.
+
+``stream_chat_completion`` consumes an OpenAI-style streaming response,
+hands the growing text to a render callback and returns the full text for
+caching.  ``MockChatClient`` mimics the parts of the OpenAI client the app
+uses and streams canned chunks, so the whole path runs offline.
+"""
+import time
+from types import SimpleNamespace
+
+
+def stream_chat_completion(client, on_text=None, min_interval=0.05, **request):
+    """Run a streaming chat completion and return ``(text, timings)``.
+
+    ``on_text`` is called with the accumulated text at most every
+    ``min_interval`` seconds, plus once at the end.  ``timings`` holds
+    ``ttft_s`` (time to first token), ``total_s`` and ``chunks``.
+    """
+    started = time.perf_counter()
+    parts = []
+    first_token = None
+    last_render = 0.0
+
+    for chunk in client.chat.completions.create(stream=True, **request):
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        now = time.perf_counter()
+        if first_token is None:
+            first_token = now - started
+        parts.append(delta)
+        if on_text is not None and now - last_render >= min_interval:
+            on_text("".join(parts))
+            last_render = now
+
+    text = "".join(parts)
+    if on_text is not None:
+        on_text(text)
+    timings = {
+        "ttft_s": first_token,
+        "total_s": time.perf_counter() - started,
+        "chunks": len(parts),
+    }
+    return text, timings
+
+
+class _MockCompletions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, stream=False, **request):
+        self.owner.requests.append(request)
+        if stream:
+            return self._stream()
+        time.sleep(self.owner.first_token_delay + self.owner.chunk_delay * len(self.owner.chunks))
+        message = SimpleNamespace(content="".join(self.owner.chunks))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def _stream(self):
+        time.sleep(self.owner.first_token_delay)
+        for text in self.owner.chunks:
+            delta = SimpleNamespace(content=text)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+            time.sleep(self.owner.chunk_delay)
+
+
+class MockChatClient:
+    """Offline stand-in for ``OpenAI()`` that returns canned text"""
+
+    DEFAULT_CHUNKS = [
+        "## Mock Market Analysis\n\n",
+        "**Overall Market Bias:** Neutral ",
+        "(Confidence: Low)\n\n",
+        "- This response was streamed from the local mock client.\n",
+    ]
+
+    def __init__(self, chunks=None, first_token_delay=0.3, chunk_delay=0.05):
+        self.chunks = list(self.DEFAULT_CHUNKS if chunks is None else chunks)
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.requests = []
+        self.chat = SimpleNamespace(completions=_MockCompletions(self))
@@ -0,0 +1,431 @@
+"""Chart analysis routines that only depend on pandas and NumPy.
+
+Everything here works on whole columns at once instead of walking the frame
+bar by bar, so it stays fast on long intraday histories.
+"""
+import numpy as np
+import pandas as pd
+
+
+def column_values(df, name):
+    """Return a column as a flat float64 array.
+
+    Canonical frames (see :func:`market_store.normalize_ohlcv`) already store
+    float64 columns, so this is a view rather than a copy.
+    """
+    return np.asarray(df[name], dtype=np.float64)
+
+
+def pivot_positions(prices, wing=2):
+    """Return positions of strict local minima and maxima.
+
+    A bar is a pivot low when its price is strictly below every price within
+    ``wing`` bars on each side (a pivot high is the mirror image).  Returns
+    ``(lows, highs)`` as ascending position arrays.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if wing < 1:
+        raise ValueError("wing must be at least 1")
+    if len(prices) < 2 * wing + 1:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+
+    windows = np.lib.stride_tricks.sliding_window_view(prices, 2 * wing + 1)
+    center = prices[wing:len(prices) - wing]
+    left, right = windows[:, :wing], windows[:, wing + 1:]
+
+    # NaN neighbours make both comparisons False, like the scalar version
+    lows = (center < left.min(axis=1)) & (center < right.min(axis=1))
+    highs = (center > left.max(axis=1)) & (center > right.max(axis=1))
+    return np.flatnonzero(lows) + wing, np.flatnonzero(highs) + wing
+
+
+def cluster_levels(keys, positions, threshold, segment_ends=None):
+    """Greedily cluster sorted level keys in a single pass.
+
+    A cluster starts at its lowest key and takes every following key less
+    than ``threshold`` above it.  ``keys`` must be ascending within each
+    segment; ``segment_ends`` (exclusive offsets, default one segment) keeps
+    clusters from spanning segments.  Returns ``(starts, mean, touches,
+    last_position)`` per cluster.
+    """
+    keys = np.asarray(keys, dtype=np.float64)
+    if segment_ends is None:
+        segment_ends = [len(keys)]
+
+    # Each step jumps straight to the next cluster, so the Python loop runs
+    # once per cluster rather than once per pivot
+    starts = []
+    segment_start = 0
+    for segment_end in segment_ends:
+        start = segment_start
+        while start < segment_end:
+            starts.append(start)
+            width = np.searchsorted(keys[start:segment_end], keys[start] + threshold, side='left')
+            start += max(1, int(width))
+        segment_start = segment_end
+    if not starts:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, np.empty(0), empty, empty
+
+    starts = np.asarray(starts)
+    touches = np.diff(np.r_[starts, len(keys)])
+    mean = np.add.reduceat(keys, starts) / touches
+    last_position = np.maximum.reduceat(positions, starts)
+    return starts, mean, touches, last_position
+
+
+def support_resistance_levels(df, wing=2, cluster_pct=0.01):
+    """Return clustered support and resistance levels as a DataFrame.
+
+    Pivots are found with :func:`pivot_positions` on ``Close``; pivots closer
+    than ``cluster_pct`` of the full price range are merged.  Columns are
+    ``kind`` ('support'/'resistance'), ``price``, ``touches`` and
+    ``last_touch``.  Supports are listed lowest first, resistances highest
+    first.
+    """
+    columns = ['kind', 'price', 'touches', 'last_touch']
+    if 'Close' not in df.columns:
+        return pd.DataFrame(columns=columns)
+
+    prices = column_values(df, 'Close')
+    lows, highs = pivot_positions(prices, wing)
+    if len(lows) == 0 and len(highs) == 0:
+        return pd.DataFrame(columns=columns)
+    threshold = (np.nanmax(prices) - np.nanmin(prices)) * cluster_pct
+
+    # Supports ascending followed by resistances on -price, so both kinds are
+    # clustered from their extreme inwards in one pass over one key array
+    lows = lows[np.argsort(prices[lows], kind='stable')]
+    highs = highs[np.argsort(-prices[highs], kind='stable')]
+    positions = np.concatenate([lows, highs])
+    sign = np.r_[np.ones(len(lows)), -np.ones(len(highs))]
+    starts, mean, touches, last = cluster_levels(
+        sign * prices[positions], positions, threshold, [len(lows), len(positions)])
+
+    is_support = starts < len(lows)
+    return pd.DataFrame({
+        'kind': np.where(is_support, 'support', 'resistance'),
+        'price': np.where(is_support, mean, -mean),
+        'touches': touches,
+        'last_touch': df.index[last],
+    })
+
+
+def find_support_resistance(df, n_levels=5, wing=2, cluster_pct=0.01):
+    """Find support and resistance levels using price extremes"""
+    levels = support_resistance_levels(df, wing=wing, cluster_pct=cluster_pct)
+    if levels.empty:
+        return [], []
+    kind = levels['kind']
+    return (levels.loc[kind == 'support', 'price'].tolist()[:n_levels],
+            levels.loc[kind == 'resistance', 'price'].tolist()[:n_levels])
+
+
+def fair_value_gap_arrays(high, low):
+    """Find every three-candle fair value gap in one vectorized pass.
+
+    A bullish gap at bar ``i`` means ``low[i+1] > high[i-1]``; a bearish gap
+    means ``high[i+1] < low[i-1]``.  Returns ``(position, is_bullish, top,
+    bottom)`` arrays ordered by position, bullish before bearish on ties.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    if len(high) < 3:
+        empty = np.empty(0)
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=bool), empty, empty
+
+    high_prev, high_next = high[:-2], high[2:]
+    low_prev, low_next = low[:-2], low[2:]
+
+    bullish = np.flatnonzero(low_next > high_prev)
+    bearish = np.flatnonzero(high_next < low_prev)
+
+    position = np.concatenate([bullish, bearish]) + 1
+    is_bullish = np.concatenate([np.ones(len(bullish), dtype=bool),
+                                 np.zeros(len(bearish), dtype=bool)])
+    top = np.concatenate([low_next[bullish], low_prev[bearish]])
+    bottom = np.concatenate([high_prev[bullish], high_next[bearish]])
+
+    order = np.lexsort((~is_bullish, position))
+    return position[order], is_bullish[order], top[order], bottom[order]
+
+
+def fair_value_gap_table(df):
+    """Return fair value gaps as a columnar DataFrame.
+
+    Columns are ``position`` (bar offset in ``df``), ``type``, ``datetime``,
+    ``top``, ``bottom`` and ``mid``.
+    """
+    if len(df) < 3:
+        position = np.empty(0, dtype=np.intp)
+        is_bullish = np.empty(0, dtype=bool)
+        top = bottom = np.empty(0)
+    else:
+        position, is_bullish, top, bottom = fair_value_gap_arrays(
+            column_values(df, 'High'), column_values(df, 'Low'))
+    return pd.DataFrame({
+        'position': position,
+        'type': np.where(is_bullish, 'bullish', 'bearish'),
+        'datetime': df.index[position],
+        'top': top,
+        'bottom': bottom,
+        'mid': (top + bottom) / 2,
+    })
+
+
+def fair_value_gap_records(table):
+    """Convert a :func:`fair_value_gap_table` into the list-of-dicts form
+
+    Tables from :func:`track_gap_fills` also carry each gap's ``status``.
+    """
+    records = [
+        {'type': t, 'datetime': dt, 'top': top, 'bottom': bottom, 'mid': mid}
+        for t, dt, top, bottom, mid in zip(
+            table['type'].tolist(), table['datetime'], table['top'].tolist(),
+            table['bottom'].tolist(), table['mid'].tolist())
+    ]
+    if 'status' in table:
+        for record, status in zip(records, table['status'].tolist()):
+            record['status'] = status
+    return records
+
+
+def find_fair_value_gaps(df):
+    """Identify fair value gaps in price data as a list of dicts"""
+    return fair_value_gap_records(fair_value_gap_table(df))
+
+
+def first_at_or_below(values, starts, thresholds, block=256):
+    """For each query, the first position >= ``start`` whose value is <= ``threshold``.
+
+    Returns ``len(values)`` where there is none.  The rest of each query's
+    starting block is checked directly; later blocks are searched by the
+    same function on the array of block minima, so the work per query is
+    logarithmic in the length of ``values``.  NaN values never match.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.intp)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    n = len(values)
+    result = np.full(len(starts), n, dtype=np.intp)
+    queries = np.flatnonzero((starts >= 0) & (starts < n))
+    if len(queries) == 0:
+        return result
+
+    n_blocks = -(-n // block)
+    padded = np.full(n_blocks * block, np.inf)
+    padded[:n] = np.where(np.isnan(values), np.inf, values)
+    blocks = padded.reshape(n_blocks, block)
+
+    start_block = starts[queries] // block
+    offset = _first_in_blocks(blocks, start_block, thresholds[queries], starts[queries] % block)
+    found = offset >= 0
+    result[queries[found]] = start_block[found] * block + offset[found]
+
+    rest = queries[~found]
+    if len(rest) and n_blocks > 1:
+        next_block = first_at_or_below(blocks.min(axis=1), start_block[~found] + 1,
+                                       thresholds[rest], block)
+        has = next_block < n_blocks
+        offset = _first_in_blocks(blocks, next_block[has], thresholds[rest[has]])
+        result[rest[has]] = next_block[has] * block + offset
+    return result
+
+
+def _first_in_blocks(blocks, rows, thresholds, offsets=None, chunk=4096):
+    """First column >= offset in each ``blocks[row]`` that is <= threshold, or -1"""
+    out = np.empty(len(rows), dtype=np.intp)
+    columns = np.arange(blocks.shape[1])
+    for lo in range(0, len(rows), chunk):
+        hits = blocks[rows[lo:lo + chunk]] <= thresholds[lo:lo + chunk, None]
+        if offsets is not None:
+            hits &= columns >= offsets[lo:lo + chunk, None]
+        out[lo:lo + chunk] = np.where(hits.any(axis=1), hits.argmax(axis=1), -1)
+    return out
+
+
+def track_gap_fills(df, table):
+    """Add fill tracking to a :func:`fair_value_gap_table`.
+
+    Scanning starts on the bar after the gap's third candle.  A bullish gap
+    is partially filled once a low trades below its top and filled once a
+    low reaches its bottom (bearish gaps mirror this with highs).  Adds
+    ``status`` ('open', 'partial' or 'filled'), ``partial_position`` /
+    ``fill_position`` (-1 when it has not happened), ``partial_time`` /
+    ``fill_time`` and the still-unfilled range ``remaining_bottom`` /
+    ``remaining_top``.
+    """
+    table = table.copy()
+    n = len(df)
+    high = column_values(df, 'High')
+    low = column_values(df, 'Low')
+    position = table['position'].to_numpy()
+    bullish = (table['type'] == 'bullish').to_numpy()
+    top = table['top'].to_numpy()
+    bottom = table['bottom'].to_numpy()
+    start = position + 2
+
+    # The most extreme price after each gap comes from suffix minima/maxima
+    suffix_low = np.r_[np.fmin.accumulate(low[::-1])[::-1], np.inf]
+    suffix_high = np.r_[np.fmax.accumulate(high[::-1])[::-1], -np.inf]
+    deepest = np.where(bullish, suffix_low[start], suffix_high[start])
+    filled = np.where(bullish, deepest <= bottom, deepest >= top)
+    entered = np.where(bullish, deepest < top, deepest > bottom)
+    table['status'] = np.where(filled, 'filled', np.where(entered, 'partial', 'open'))
+
+    # When it happened: first low at/below a level, with highs negated for bearish gaps
+    partial_position = np.full(len(table), -1, dtype=np.intp)
+    fill_position = np.full(len(table), -1, dtype=np.intp)
+    for is_bullish, values in ((True, low), (False, -high)):
+        rows = np.flatnonzero((bullish == is_bullish) & entered)
+        if not len(rows):
+            continue
+        if is_bullish:
+            entry_level, fill_level = np.nextafter(top[rows], -np.inf), bottom[rows]
+        else:
+            entry_level, fill_level = np.nextafter(-bottom[rows], -np.inf), -top[rows]
+        partial_position[rows] = first_at_or_below(values, start[rows], entry_level)
+        done = rows[filled[rows]]
+        fill_position[done] = first_at_or_below(values, start[done], fill_level[filled[rows]])
+
+    table['partial_position'] = partial_position
+    table['fill_position'] = fill_position
+    for name, pos in (('partial_time', partial_position), ('fill_time', fill_position)):
+        times = df.index[np.clip(pos, 0, max(n - 1, 0))] if n else df.index[:0]
+        table[name] = times.where(pos >= 0) if len(pos) else times
+    table['remaining_bottom'] = np.where(bullish | filled, bottom, np.maximum(bottom, deepest))
+    table['remaining_top'] = np.where(~bullish | filled, top, np.minimum(top, deepest))
+    return table
+
+
+def unfilled_fair_value_gaps(df):
+    """Fair value gaps price has not traded through yet (open or partially filled)"""
+    table = track_gap_fills(df, fair_value_gap_table(df))
+    return table[table['status'] != 'filled'].reset_index(drop=True)
+
+
+class OpenGapIndex:
+    """Unfilled fair value gaps indexed by their remaining price range.
+
+    Gaps containing a price come from the interval tree behind a pandas
+    ``IntervalIndex``; gaps entirely above or below it come from the
+    remaining bottoms and tops kept in sorted order.  Queries cost a binary
+    search plus the gaps they return, not a scan of every gap.
+    """
+
+    def __init__(self, table):
+        gaps = table[table['status'] != 'filled'] if 'status' in table else table
+        self.gaps = gaps.reset_index(drop=True)
+        bottom = self.gaps.get('remaining_bottom', self.gaps['bottom']).to_numpy(dtype=np.float64)
+        top = self.gaps.get('remaining_top', self.gaps['top']).to_numpy(dtype=np.float64)
+        self._intervals = pd.IntervalIndex.from_arrays(bottom, top, closed='both')
+        # Stable orders, so gaps at the same level stay oldest first
+        self._by_bottom = np.argsort(bottom, kind='stable')
+        self._bottoms = bottom[self._by_bottom]
+        self._by_top = np.argsort(-top, kind='stable')
+        self._negated_tops = -top[self._by_top]
+
+    def __len__(self):
+        return len(self.gaps)
+
+    def _containing(self, price):
+        rows = self._intervals.get_indexer_non_unique([float(price)])[0]
+        return rows[rows >= 0]
+
+    def containing(self, price):
+        """Gaps whose remaining range contains ``price``, oldest first"""
+        if not len(self.gaps):
+            return self.gaps
+        return self.gaps.iloc[np.sort(self._containing(price))]
+
+    def overlapping(self, low, high):
+        """Gaps whose remaining range overlaps ``[low, high]``, oldest first"""
+        if not len(self.gaps) or low > high:
+            return self.gaps.iloc[:0]
+        # Those reaching down to ``low``, plus those starting inside (low, high]
+        inside = self._by_bottom[np.searchsorted(self._bottoms, low, 'right'):
+                                 np.searchsorted(self._bottoms, high, 'right')]
+        return self.gaps.iloc[np.sort(np.concatenate([self._containing(low), inside]))]
+
+    def nearest(self, price, count=5):
+        """The ``count`` gaps closest to ``price``, nearest (then oldest) first"""
+        if not len(self.gaps):
+            return self.gaps
+        price = float(price)
+        # Candidates: the gaps containing it and the closest ``count`` above and below
+        contained = self._containing(price)
+        above = np.searchsorted(self._bottoms, price, 'right')
+        above = slice(above, above + count)
+        below = np.searchsorted(self._negated_tops, -price, 'right')
+        below = slice(below, below + count)
+        rows = np.concatenate([contained, self._by_bottom[above], self._by_top[below]])
+        distance = np.concatenate([np.zeros(len(contained)), self._bottoms[above] - price,
+                                   self._negated_tops[below] + price])
+        return self.gaps.iloc[rows[np.lexsort((rows, distance))][:count]]
+
+
+# Signal rules are data: each signal fires when ANY of its clauses holds, and
+# a clause holds when ALL of its (left, op, right) conditions hold.  ``right``
+# is either a column name or a constant.
+SIGNAL_RULES = {
+    'buy': [
+        # SMA9 crosses above SMA20 + RSI < 60 + MACD > 0
+        [('SMA_9', 'crosses_above', 'SMA_20'), ('RSI', '<', 60), ('MACD', '>', 0)],
+    ],
+    'sell': [
+        # RSI > 70 or MACD crosses below signal
+        [('RSI', '>', 70)],
+        [('MACD', 'crosses_below', 'MACD_Signal')],
+    ],
+}
+
+
+def _previous(values):
+    """Shift an array one bar to the right, padding with NaN"""
+    shifted = np.empty_like(values)
+    shifted[:1] = np.nan
+    shifted[1:] = values[:-1]
+    return shifted
+
+
+SIGNAL_OPERATORS = {
+    '<': lambda left, right: left < right,
+    '<=': lambda left, right: left <= right,
+    '>': lambda left, right: left > right,
+    '>=': lambda left, right: left >= right,
+    'crosses_above': lambda left, right: (_previous(left) <= _previous(right)) & (left > right),
+    'crosses_below': lambda left, right: (_previous(left) >= _previous(right)) & (left < right),
+}
+
+
+def generate_signals(df, rules=None, warmup=50):
+    """Evaluate signal rules over whole columns.
+
+    Returns a dict mapping each signal name in ``rules`` (default
+    :data:`SIGNAL_RULES`) to the ascending bar positions where it fires.
+    Bars before ``warmup`` never fire, and NaN inputs never satisfy a
+    condition.
+    """
+    rules = SIGNAL_RULES if rules is None else rules
+    columns = {}
+
+    def operand(value):
+        if isinstance(value, str):
+            if value not in columns:
+                columns[value] = column_values(df, value)
+            return columns[value]
+        return value
+
+    signals = {}
+    for name, clauses in rules.items():
+        fired = np.zeros(len(df), dtype=bool)
+        for clause in clauses:
+            holds = np.ones(len(df), dtype=bool)
+            for left, op, right in clause:
+                holds &= SIGNAL_OPERATORS[op](operand(left), operand(right))
+            fired |= holds
+        fired[:warmup] = False
+        signals[name] = np.flatnonzero(fired)
+    return signals
+
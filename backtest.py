@@ -0,0 +1,291 @@
+"""Vectorized backtests of the chart's BUY/SELL rules.
+
+The strategy is long-only: a BUY signal enters at that bar's close, the next
+SELL signal exits at its close, and signals that do not change the position
+are ignored.  The position is derived for the whole array at once by
+forward-filling the last signal, so a backtest costs a handful of NumPy
+passes regardless of the number of bars or trades.
+
+Parameter sweeps evaluate every combination of a grid on a process pool;
+each worker computes an indicator column once and reuses it across all the
+combinations that need it.
+
+    python -m backtest BTC-USD --interval 60m --period 1y
+    python -m backtest BTC-USD --sma-fast 5,9,12 --sma-slow 20,30,50 --rsi-buy 50,60,70
+"""
+import argparse
+import itertools
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analysis import generate_signals
+from indicators import rsi
+
+DEFAULT_PARAMS = {'sma_fast': 9, 'sma_slow': 20, 'rsi_buy': 60, 'rsi_sell': 70, 'rsi_period': 14}
+
+_COLUMN_RE = re.compile(r"^(SMA|EMA|RSI)_(\d+)$")
+
+
+def strategy_rules(sma_fast=9, sma_slow=20, rsi_buy=60, rsi_sell=70, rsi_period=14):
+    """Signal rules in :data:`analysis.SIGNAL_RULES` form for one parameter set.
+
+    The defaults reproduce the rules drawn on the chart.
+    """
+    rsi_column = 'RSI' if rsi_period == 14 else f'RSI_{rsi_period}'
+    return {
+        'buy': [
+            [(f'SMA_{sma_fast}', 'crosses_above', f'SMA_{sma_slow}'),
+             (rsi_column, '<', rsi_buy), ('MACD', '>', 0)],
+        ],
+        'sell': [
+            [(rsi_column, '>', rsi_sell)],
+            [('MACD', 'crosses_below', 'MACD_Signal')],
+        ],
+    }
+
+
+class IndicatorColumns:
+    """Lazily computed indicator columns for one close series.
+
+    Behaves enough like a DataFrame (``len`` and ``[name]``) to be passed to
+    :func:`analysis.generate_signals`.  Understands ``SMA_<n>``, ``EMA_<n>``,
+    ``RSI``/``RSI_<n>``, ``MACD``, ``MACD_Signal`` and ``MACD_Hist``; columns
+    are cached, so a sweep computes each one once.
+    """
+
+    def __init__(self, close):
+        self.close = pd.Series(np.asarray(close, dtype=np.float64))
+        self._columns = {'Close': self.close.to_numpy()}
+
+    def __len__(self):
+        return len(self.close)
+
+    def __getitem__(self, name):
+        if name not in self._columns:
+            self._columns[name] = self._compute(name)
+        return self._columns[name]
+
+    def _compute(self, name):
+        if name == 'RSI':
+            return rsi(self.close).to_numpy()
+        if name in ('MACD', 'MACD_Signal', 'MACD_Hist'):
+            macd = self['EMA_12'] - self['EMA_26']
+            signal = pd.Series(macd).ewm(span=9, adjust=False).mean().to_numpy()
+            self._columns.update({'MACD': macd, 'MACD_Signal': signal, 'MACD_Hist': macd - signal})
+            return self._columns[name]
+        match = _COLUMN_RE.match(name)
+        if match is None:
+            raise KeyError(name)
+        kind, length = match.group(1), int(match.group(2))
+        if kind == 'SMA':
+            return self.close.rolling(window=length).mean().to_numpy()
+        if kind == 'EMA':
+            return self.close.ewm(span=length, adjust=False).mean().to_numpy()
+        return rsi(self.close, length).to_numpy()
+
+
+def position_changes(n_bars, buys, sells):
+    """Return ``(long, entries, exits)`` for signal positions.
+
+    ``long[t]`` is whether the strategy holds from bar ``t``'s close to the
+    next one.  A bar with both signals counts as a SELL.  An open trade's exit
+    is not included in ``exits``.
+    """
+    event = np.zeros(n_bars, dtype=np.int8)
+    event[buys] = 1
+    event[sells] = -1
+    last = np.maximum.accumulate(np.where(event != 0, np.arange(n_bars), -1))
+    long = (last >= 0) & (event[np.maximum(last, 0)] == 1)
+    change = np.diff(long.astype(np.int8), prepend=np.int8(0))
+    return long, np.flatnonzero(change == 1), np.flatnonzero(change == -1)
+
+
+def performance(close, long, entries, exits, fee=0.0):
+    """Summary statistics for a position array.
+
+    ``fee`` is charged as a fraction of equity on every entry and exit.
+    Returns a dict with ``total_return``, ``max_drawdown``, ``trades``,
+    ``win_rate``, ``avg_trade``, ``exposure`` and ``buy_and_hold``, plus the
+    per-trade returns under ``trade_returns``.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n_bars = len(close)
+    log_return = np.zeros(n_bars)
+    if n_bars > 1:
+        bar_log = np.log(close[1:] / close[:-1])
+        log_return[1:] = np.where(long[:-1], np.nan_to_num(bar_log), 0.0)
+    if fee:
+        fee_log = np.log1p(-fee)
+        np.add.at(log_return, entries, fee_log)
+        np.add.at(log_return, exits, fee_log)
+    equity = np.exp(np.cumsum(log_return))
+    drawdown = 1 - equity / np.maximum.accumulate(equity) if n_bars else np.zeros(0)
+
+    exit_positions = np.r_[exits, n_bars - 1] if len(exits) < len(entries) else exits
+    trade_returns = close[exit_positions] / close[entries] * (1 - fee) ** 2 - 1
+    return {
+        'total_return': float(equity[-1] - 1) if n_bars else 0.0,
+        'max_drawdown': float(drawdown.max()) if n_bars else 0.0,
+        'trades': len(entries),
+        'win_rate': float(np.mean(trade_returns > 0)) if len(entries) else np.nan,
+        'avg_trade': float(trade_returns.mean()) if len(entries) else np.nan,
+        'exposure': float(long.mean()) if n_bars else 0.0,
+        'buy_and_hold': float(close[-1] / close[0] - 1) if n_bars else 0.0,
+        'trade_returns': trade_returns,
+    }
+
+
+def backtest_signals(df, signals, fee=0.0):
+    """Backtest already generated signals on an OHLCV frame.
+
+    Returns ``(stats, trades)``; ``trades`` has one row per trade with entry
+    and exit bar positions, times, prices, return and an ``open`` flag.
+    """
+    close = df['Close'].to_numpy()
+    long, entries, exits = position_changes(len(close), signals['buy'], signals['sell'])
+    stats = performance(close, long, entries, exits, fee)
+    trade_returns = stats.pop('trade_returns')
+
+    is_open = np.zeros(len(entries), dtype=bool)
+    exit_positions = exits
+    if len(exits) < len(entries):
+        exit_positions = np.r_[exits, len(close) - 1]
+        is_open[-1] = True
+    trades = pd.DataFrame({
+        'entry': entries,
+        'exit': exit_positions,
+        'entry_time': df.index[entries],
+        'exit_time': df.index[exit_positions],
+        'entry_price': close[entries],
+        'exit_price': close[exit_positions],
+        'return': trade_returns,
+        'open': is_open,
+    })
+    return stats, trades
+
+
+def backtest(df, fee=0.0, warmup=50, **params):
+    """Backtest the chart rules on an OHLCV frame; returns ``(stats, trades)``"""
+    columns = IndicatorColumns(df['Close'].to_numpy())
+    signals = generate_signals(columns, strategy_rules(**{**DEFAULT_PARAMS, **params}), warmup)
+    return backtest_signals(df, signals, fee)
+
+
+# Per-process state for sweeps, so the close array is shipped once per worker
+_worker_columns = None
+
+
+def _init_worker(close):
+    global _worker_columns
+    _worker_columns = IndicatorColumns(close)
+
+
+def _run_combinations(combinations, fee, warmup):
+    rows = []
+    for params in combinations:
+        signals = generate_signals(_worker_columns, strategy_rules(**params), warmup)
+        long, entries, exits = position_changes(len(_worker_columns), signals['buy'], signals['sell'])
+        stats = performance(_worker_columns['Close'], long, entries, exits, fee)
+        del stats['trade_returns']
+        rows.append({**params, **stats})
+    return rows
+
+
+def parameter_grid(**values):
+    """Every combination of the given parameter lists, over :data:`DEFAULT_PARAMS`"""
+    names = list(values)
+    combinations = []
+    for combo in itertools.product(*(values[name] for name in names)):
+        params = {**DEFAULT_PARAMS, **dict(zip(names, combo))}
+        if params['sma_fast'] < params['sma_slow']:
+            combinations.append(params)
+    return combinations
+
+
+def sweep(df, grid, fee=0.0, warmup=50, workers=None):
+    """Backtest every parameter set in ``grid`` and return a results frame.
+
+    ``grid`` is a list of parameter dicts (see :func:`parameter_grid`).
+    Combinations are split into chunks across ``workers`` processes
+    (default: all CPUs); rows come back sorted by total return.
+    """
+    close = df['Close'].to_numpy()
+    workers = min(workers or os.cpu_count() or 1, len(grid) or 1)
+    if workers == 1:
+        _init_worker(close)
+        rows = _run_combinations(grid, fee, warmup)
+    else:
+        # Group by SMA lengths so each worker reuses the columns it computed
+        grid = sorted(grid, key=lambda p: (p['sma_fast'], p['sma_slow'], p['rsi_period']))
+        size = -(-len(grid) // (workers * 4))
+        chunks = [grid[i:i + size] for i in range(0, len(grid), size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(close,)) as pool:
+            rows = [row for chunk in pool.map(_run_combinations, chunks,
+                                              itertools.repeat(fee), itertools.repeat(warmup))
+                    for row in chunk]
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results
+    return results.sort_values('total_return', ascending=False, ignore_index=True)
+
+
+def _int_list(text):
+    return [int(v) for v in text.split(",")]
+
+
+def _float_list(text):
+    return [float(v) for v in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the chart's BUY/SELL rules")
+    parser.add_argument("symbol")
+    parser.add_argument("--interval", default="60m")
+    parser.add_argument("--period", default="1y")
+    parser.add_argument("--store", default=os.environ.get("MARKET_STORE_DIR", ".market_store"))
+    parser.add_argument("--provider", default=os.environ.get("MARKET_DATA_PROVIDER", "yfinance"),
+                        help="yfinance, replay or synthetic")
+    parser.add_argument("--no-fetch", action="store_true", help="use only bars already stored")
+    parser.add_argument("--fee", type=float, default=0.0, help="fee per side, e.g. 0.001")
+    parser.add_argument("--sma-fast", type=_int_list, default=[9])
+    parser.add_argument("--sma-slow", type=_int_list, default=[20])
+    parser.add_argument("--rsi-buy", type=_float_list, default=[60])
+    parser.add_argument("--rsi-sell", type=_float_list, default=[70])
+    parser.add_argument("--rsi-period", type=_int_list, default=[14])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20, help="rows of the sweep to print")
+    args = parser.parse_args(argv)
+
+    from market_store import MarketDataStore
+    from pipeline import load_stored_bars
+    from providers import get_provider, store_root
+    from resample import source_interval
+
+    provider = get_provider(args.provider)
+    store = MarketDataStore(store_root(args.store, provider))
+    if not args.no_fetch:
+        store.fetch(args.symbol, source_interval(args.interval, args.period), args.period,
+                    provider.download)
+    df = load_stored_bars(store, args.symbol, args.interval, args.period)
+
+    grid = parameter_grid(sma_fast=args.sma_fast, sma_slow=args.sma_slow, rsi_buy=args.rsi_buy,
+                          rsi_sell=args.rsi_sell, rsi_period=args.rsi_period)
+    started = time.perf_counter()
+    if len(grid) == 1:
+        stats, trades = backtest(df, fee=args.fee, **grid[0])
+        print(trades.to_string(index=False))
+        print(pd.Series(stats).to_string())
+    else:
+        results = sweep(df, grid, fee=args.fee, workers=args.workers)
+        print(results.head(args.top).to_string(index=False))
+    print(f"{len(grid)} parameter set(s) over {len(df):,} bars in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
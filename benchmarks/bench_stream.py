@@ -0,0 +1,93 @@
+"""Replay recorded trades through the streaming bar path and time tick-to-metrics.
+
+Run from the repository root (no network access needed):
+
+    python -m benchmarks.bench_stream
+    python -m benchmarks.bench_stream --ticks 200000 --bars 100000 --target-ms 2
+
+A seeded trade tape is written to a temporary directory and replayed by the
+file feed as fast as possible into a :class:`streaming.BarStream` seeded
+with synthetic bars.  The bars the stream still holds are checked against
+the tape aggregated with pandas, and the tick-to-metrics latency percentiles are
+compared with the target; the exit status is 1 when the p99 exceeds it.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_ohlcv
+from market_store import normalize_ohlcv
+from streaming import LATENCY_TARGET_MS, BarStream, FileReplayFeed
+
+
+def make_ticks(start, n_ticks, minutes, seed=0, price=100.0):
+    """Seeded trades spread over ``minutes`` from ``start``, as a time/price/size frame"""
+    rng = np.random.default_rng(seed)
+    offsets = np.sort(rng.integers(0, minutes * 60 * 10**9, n_ticks))
+    return pd.DataFrame({
+        'time': pd.DatetimeIndex(start.value + offsets, tz='UTC'),
+        'price': price * np.exp(np.cumsum(rng.normal(0, 0.0002, n_ticks))),
+        'size': rng.integers(1, 500, n_ticks).astype(np.float64),
+    })
+
+
+def expected_bars(ticks, interval):
+    """The tape aggregated into bars with pandas, as the reference"""
+    grouped = ticks.set_index('time').resample(interval, label='left', closed='left')
+    bars = grouped['price'].ohlc().join(grouped['size'].sum().rename('Volume')).dropna()
+    bars.columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+    return bars
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bars', type=int, default=10_000, help='cached bars the stream starts from')
+    parser.add_argument('--ticks', type=int, default=50_000)
+    parser.add_argument('--minutes', type=int, default=240, help='span of the trade tape')
+    parser.add_argument('--display', default='5m', help='display timeframe the live stats use')
+    parser.add_argument('--window', type=int, default=24, help='trailing candles the live stats cover')
+    parser.add_argument('--target-ms', type=float, default=LATENCY_TARGET_MS)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    base = normalize_ohlcv(make_ohlcv(args.bars, seed=args.seed))
+    start = base.index[-1] + pd.Timedelta(minutes=1)
+    ticks = make_ticks(start, args.ticks, args.minutes, seed=args.seed,
+                       price=float(base['Close'].iloc[-1]))
+
+    stream = BarStream(base, '1m', display=args.display, window=args.window, max_latencies=args.ticks)
+    with tempfile.TemporaryDirectory() as root:
+        ticks.to_parquet(os.path.join(root, 'SYN_ticks.parquet'))
+        feed = FileReplayFeed(root, speed=0, shift_to_now=False)
+        feed.subscribe('SYN', stream.on_tick)
+        started = time.perf_counter()
+        feed.start().join()
+        elapsed = time.perf_counter() - started
+
+    # Only the bars the stats reach are held; older ones come from the bar store
+    streamed = stream.frame().iloc[len(base):]
+    expected = expected_bars(ticks, '1min').iloc[-len(streamed):]
+    expected.index = expected.index.as_unit(base.index.unit)
+    pd.testing.assert_frame_equal(streamed.astype(np.float64), expected, check_names=False,
+                                  check_freq=False)
+    pd.testing.assert_frame_equal(stream.frame().iloc[:len(base)], base)
+
+    summary = stream.latency_summary(args.target_ms)
+    print(f"{stream.ticks:,} ticks -> {len(streamed):,} bars in {elapsed:.2f}s "
+          f"({stream.ticks / elapsed:,.0f} ticks/s), late {stream.late_ticks}")
+    print(f"tick-to-metrics p50 {summary['p50_ms']:.3f}ms  p99 {summary['p99_ms']:.3f}ms  "
+          f"max {summary['max_ms']:.3f}ms  target {summary['target_ms']:.1f}ms  "
+          f"over target {summary['over_target']:,}")
+    if summary['p99_ms'] > args.target_ms:
+        print('REGRESSION: p99 tick-to-metrics latency is over the target')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
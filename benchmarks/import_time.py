@@ -0,0 +1,82 @@
+"""Check cold import time of the core modules against a budget.
+
+Run from the repository root:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --scale 2    # slower machine, double every budget
+
+Every module is imported in a fresh interpreter with ``-X importtime`` (best
+of ``--repeat`` runs).  The check fails when a module exceeds its budget or
+when importing it pulls in one of the heavy UI/SDK packages, which must only
+load on the paths that use them.
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+# Cumulative import time budgets in milliseconds; pandas alone is most of the core's
+IMPORT_BUDGETS_MS = {
+    'analysis': 1000,
+    'indicators': 1000,
+    'prompts': 1000,
+    'backtest': 1000,
+    'resample': 1000,
+    'market_store': 1000,
+    'providers': 1000,
+    'pipeline': 1000,
+    'live': 1000,
+    'streaming': 1000,
+    'memo': 300,
+    'prefetch': 100,
+    'telemetry': 100,
+    'ai_cache': 100,
+    'ai_health': 100,
+    'ai_stream': 100,
+}
+
+HEAVY_MODULES = ('streamlit', 'plotly', 'openai', 'yfinance')
+
+
+def import_time(module):
+    """Return ``(cumulative ms, heavy modules loaded)`` for a cold import of ``module``"""
+    code = (f"import sys, {module}; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, check=True)
+    pattern = re.compile(rf"^import time:\s+\d+ \|\s+(\d+) \|\s*{re.escape(module)}$")
+    for line in result.stderr.splitlines():
+        match = pattern.match(line)
+        if match:
+            loaded = result.stdout.strip()
+            return int(match.group(1)) / 1e3, loaded.split(',') if loaded else []
+    raise RuntimeError(f"no import time reported for {module}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=list(IMPORT_BUDGETS_MS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every budget')
+    args = parser.parse_args(argv)
+
+    failed = 0
+    print(f"{'module':<16} {'import':>10} {'budget':>10}")
+    for module in args.modules:
+        runs = [import_time(module) for _ in range(args.repeat)]
+        ms = min(run[0] for run in runs)
+        heavy = runs[0][1]
+        budget = IMPORT_BUDGETS_MS.get(module, 1000) * args.scale
+        problems = []
+        if ms > budget:
+            problems.append('over budget')
+        if heavy:
+            problems.append(f"loads {', '.join(heavy)}")
+        failed += bool(problems)
+        flag = f"  FAIL ({'; '.join(problems)})" if problems else ''
+        print(f"{module:<16} {ms:>8.0f}ms {budget:>8.0f}ms{flag}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
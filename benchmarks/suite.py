@@ -0,0 +1,191 @@
+"""Time every hot path on synthetic data and compare against stored baselines.
+
+Run from the repository root (no network access needed):
+
+    python -m benchmarks.suite                     # compare with baselines.json
+    python -m benchmarks.suite --save              # record new baselines
+    python -m benchmarks.suite --sizes 1000 --stages signals chart
+
+Each stage is timed on 1k, 100k and 1M bars (best of ``--repeat`` runs) and
+its peak traced memory is recorded from one extra run.  A stage is flagged
+as a regression when it is slower or uses more memory than its baseline by
+more than the tolerance; the exit status is then 1.  Baselines are machine
+specific, so re-record them with ``--save`` when the hardware changes.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from analysis import (
+    fair_value_gap_table,
+    find_fair_value_gaps,
+    find_support_resistance,
+    generate_signals,
+    track_gap_fills,
+)
+from backtest import backtest_signals
+from benchmarks.synthetic import make_ohlcv
+from charting import build_price_chart
+from indicators import compute_indicators
+from market_store import normalize_ohlcv
+from prompts import build_prompt_context
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+# Differences below these floors are noise, whatever the ratio
+MIN_SECONDS_DELTA = 0.002
+MIN_PEAK_MB_DELTA = 1.0
+
+
+def _enriched(raw):
+    df = normalize_ohlcv(raw)
+    return df.join(compute_indicators(df['Close']))
+
+
+def _chart_inputs(raw):
+    df = _enriched(raw)
+    signals = generate_signals(df)
+    supports, resistances = find_support_resistance(df)
+    return df, signals, supports, resistances, fair_value_gap_table(df)
+
+
+def _build_chart(inputs):
+    df, signals, supports, resistances, fvg_table = inputs
+    return build_price_chart(df, "SYN", buy_signals=signals['buy'], sell_signals=signals['sell'],
+                             supports=supports, resistances=resistances, fvg_table=fvg_table,
+                             width_px=1920)
+
+
+def _backtest_inputs(raw):
+    df = _enriched(raw)
+    return df, generate_signals(df)
+
+
+# name -> (setup(raw MultiIndex frame) -> input, run(input)); only run is timed
+STAGES = {
+    'normalize': (lambda raw: raw, normalize_ohlcv),
+    'indicators': (lambda raw: normalize_ohlcv(raw)['Close'], compute_indicators),
+    'support_resistance': (_enriched, find_support_resistance),
+    'fair_value_gaps': (_enriched, find_fair_value_gaps),
+    'gap_fills': (lambda raw: (_enriched(raw), fair_value_gap_table(normalize_ohlcv(raw))),
+                  lambda args: track_gap_fills(*args)),
+    'signals': (_enriched, generate_signals),
+    'chart': (_chart_inputs, _build_chart),
+    'prompt': (_enriched, lambda df: build_prompt_context(df, 'SYN')),
+    'backtest': (_backtest_inputs, lambda args: backtest_signals(*args)),
+}
+
+
+def measure(run, value, repeat):
+    """Return ``(best seconds, peak traced MB)`` for ``run(value)``"""
+    run(value)  # warm caches and lazy imports outside the measurement
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run(value)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        run(value)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2**20
+
+
+def run_suite(stages, sizes, repeat, seed=0):
+    """Run ``stages`` at every size and return ``{"stage@bars": result}``"""
+    results = {}
+    for n_bars in sizes:
+        raw = make_ohlcv(n_bars, seed=seed)
+        for name in stages:
+            setup, run = STAGES[name]
+            seconds, peak_mb = measure(run, setup(raw), repeat if n_bars < 1_000_000 else 1)
+            results[f"{name}@{n_bars}"] = {'seconds': seconds, 'peak_mb': peak_mb}
+            print(f"  {name:<20} {n_bars:>9,} bars  {seconds * 1e3:>10.1f}ms  {peak_mb:>9.1f}MB",
+                  file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    """Return rows of ``(key, result, base, regressions)`` for every result"""
+    rows = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        regressions = []
+        if base is not None:
+            if result['seconds'] > base['seconds'] * (1 + time_tolerance) and \
+                    result['seconds'] - base['seconds'] > MIN_SECONDS_DELTA:
+                regressions.append('time')
+            if result['peak_mb'] > base['peak_mb'] * (1 + memory_tolerance) and \
+                    result['peak_mb'] - base['peak_mb'] > MIN_PEAK_MB_DELTA:
+                regressions.append('memory')
+        rows.append((key, result, base, regressions))
+    return rows
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage (1 at 1M bars)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--time-tolerance', type=float, default=0.5,
+                        help='allowed slowdown as a fraction of the baseline')
+    parser.add_argument('--memory-tolerance', type=float, default=0.2,
+                        help='allowed peak memory growth as a fraction of the baseline')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.stages, args.sizes, args.repeat, args.seed)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get('results', {})
+
+    if args.save:
+        merged = {**baseline, **results}
+        with open(args.baseline, 'w') as f:
+            json.dump({'environment': environment(), 'results': merged}, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} baseline(s) to {args.baseline}")
+        return 0
+
+    print(f"{'stage@bars':<28} {'time':>10} {'baseline':>10} {'peak':>9} {'baseline':>9}")
+    flagged = 0
+    for key, result, base, regressions in compare(results, baseline, args.time_tolerance,
+                                                  args.memory_tolerance):
+        base_time = f"{base['seconds'] * 1e3:.1f}ms" if base else '-'
+        base_peak = f"{base['peak_mb']:.1f}MB" if base else '-'
+        flag = f"  REGRESSION ({', '.join(regressions)})" if regressions else ''
+        flagged += bool(regressions)
+        print(f"{key:<28} {result['seconds'] * 1e3:>8.1f}ms {base_time:>10} "
+              f"{result['peak_mb']:>7.1f}MB {base_peak:>9}{flag}")
+    if not baseline:
+        print(f"No baseline at {args.baseline}; record one with --save")
+    return 1 if flagged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""Seeded synthetic OHLCV data for benchmarks and offline runs."""
+import numpy as np
+import pandas as pd
+
+
+def make_ohlcv(n_bars, seed=0, multiindex=True, ticker='SYN', freq='1min', start='2020-01-01'):
+    """Random-walk OHLCV frame, reproducible for a given ``seed``.
+
+    Prices follow a geometric random walk so they stay positive at any
+    length.  With ``multiindex`` the columns are (Price, Ticker) pairs, the
+    shape yfinance returns even for a single ticker.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n_bars)))
+    open_ = np.r_[close[0], close[:-1]]
+    wick = np.abs(rng.normal(0, 0.0015, (2, n_bars))) * close
+    frame = pd.DataFrame({
+        'Close': close,
+        'High': np.maximum(open_, close) + wick[0],
+        'Low': np.minimum(open_, close) - wick[1],
+        'Open': open_,
+        'Volume': rng.integers(1, 10_000, n_bars),
+    }, index=pd.date_range(start, periods=n_bars, freq=freq, tz='UTC', name='Datetime'))
+    if multiindex:
+        frame.columns = pd.MultiIndex.from_product([frame.columns, [ticker]], names=['Price', 'Ticker'])
+    return frame
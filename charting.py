@@ -0,0 +1,361 @@
+"""Plotly figure construction for the main price chart.
+
+The figure always has a fixed number of traces: signals, level lines and
+bands, and fair value gaps are each drawn as one batched trace per type
+(using NaN breaks between segments) instead of one trace or shape per
+item.  Long series switch to WebGL scatter traces.
+"""
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from downsample import bucket_count, minmax_positions, ohlcv_buckets
+
+# Above this many points line traces are drawn with WebGL (Scattergl)
+WEBGL_THRESHOLD = 5000
+
+# Enable drawing tools and zooming by default
+CHART_CONFIG = {
+    'modeBarButtonsToAdd': [
+        'drawline',
+        'drawopenpath',
+        'drawclosedpath',
+        'drawcircle',
+        'drawrect',
+        'eraseshape'
+    ],
+    'scrollZoom': True
+}
+
+
+def _segments(x, start, end, y0, y1, closed=False):
+    """Flatten many horizontal segments (or rectangles) into one x/y pair.
+
+    ``start``/``end`` are bar positions into ``x``.  Segments are separated
+    by a NaN y value, which Plotly draws as a gap (and, with
+    ``fill="toself"``, as separate shapes).  Keeping x as a datetime64
+    array instead of an object array with ``None`` keeps validation cheap.
+    """
+    n = len(y0)
+    start = np.broadcast_to(np.asarray(start, dtype=np.intp), (n,))
+    end = np.broadcast_to(np.asarray(end, dtype=np.intp), (n,))
+    gap = np.full(n, np.nan)
+    if closed:
+        xs = np.column_stack([start, end, end, start, start, start])
+        ys = np.column_stack([y0, y0, y1, y1, y0, gap])
+    else:
+        xs = np.column_stack([start, end, end])
+        ys = np.column_stack([y0, y1, gap])
+    return x[xs.ravel()], ys.ravel()
+
+
+def _add_levels(fig, x, levels, line_color, band_color, name):
+    """Draw every level as one dashed-line trace plus one band trace"""
+    if not len(levels):
+        return
+    levels = np.asarray(levels, dtype=np.float64)
+    last = len(x) - 1
+
+    x_line, y_line = _segments(x, 0, last, levels, levels)
+    fig.add_trace(go.Scatter(
+        x=x_line, y=y_line,
+        mode="lines",
+        line=dict(color=line_color, width=2, dash="dash"),
+        name=name,
+        showlegend=False,
+        hoverinfo="skip"
+    ), row=1, col=1)
+
+    # Add enhanced gradient effect
+    x_band, y_band = _segments(x, 0, last, levels - levels * 0.002, levels + levels * 0.002, closed=True)
+    fig.add_trace(go.Scatter(
+        x=x_band, y=y_band,
+        mode="lines",
+        fill="toself",
+        fillcolor=band_color,
+        line=dict(width=0),
+        showlegend=False,
+        hoverinfo="skip"
+    ), row=1, col=1)
+
+
+def _add_signals(fig, x, y, color, symbol, label, textposition):
+    """Draw one signal type as a marker trace plus a single glow trace"""
+    if not len(x):
+        return
+    fig.add_trace(go.Scatter(
+        x=x,
+        y=y,
+        mode="markers+text",
+        marker=dict(
+            color=color,
+            size=20,          # Larger size
+            symbol=symbol,
+            line=dict(width=3, color="#ffffff"),
+            gradient=dict(
+                type="radial",
+                color=color
+            )
+        ),
+        text=[label] * len(x),
+        textposition=textposition,
+        textfont=dict(
+            color="#ffffff",
+            size=14,          # Larger text
+            family="Arial Black"
+        ),
+        name=f"{label.title()} Signal",
+        hovertemplate=f"{label} Signal<br>Price: $%{{y:.2f}}<br>Date: %{{x}}<extra></extra>"
+    ), row=1, col=1)
+
+    # Add enhanced glowing effect
+    fig.add_trace(go.Scatter(
+        x=x,
+        y=y,
+        mode="markers",
+        marker=dict(
+            color=color,
+            size=40,      # Larger glow
+            symbol=symbol,
+            opacity=0.4,
+            line=dict(width=0)
+        ),
+        showlegend=False,
+        hoverinfo="skip"
+    ), row=1, col=1)
+
+
+def build_price_chart(df, title, chart_type="Candlestick", show_volume=True,
+                      buy_signals=(), sell_signals=(), supports=(), resistances=(),
+                      fvg_table=None, width_px=None):
+    """Build the main price/volume figure.
+
+    ``buy_signals``/``sell_signals`` are bar positions into ``df`` and
+    ``fvg_table`` is the output of ``analysis.fair_value_gap_table``.
+    When ``width_px`` is given, candles/volume and line series longer than
+    the chart can resolve are decimated (see ``downsample``); signals,
+    levels and gaps always keep their exact positions.  Returns ``(fig,
+    stats)`` where ``stats`` holds the trace/shape/point counts and the build
+    time in milliseconds.
+    """
+    started = time.perf_counter()
+    # Plotly shows wall-clock time anyway; a naive datetime64 array avoids
+    # it deep-copying one Timestamp object per bar for tz-aware indexes
+    x = df.index
+    if getattr(x, "tz", None) is not None:
+        x = x.tz_localize(None)
+    x = np.asarray(x)
+    open_ = df["Open"].to_numpy(dtype=np.float64)
+    high = df["High"].to_numpy(dtype=np.float64)
+    low = df["Low"].to_numpy(dtype=np.float64)
+    close = df["Close"].to_numpy(dtype=np.float64)
+    volume = df["Volume"].to_numpy(dtype=np.float64) if show_volume else None
+
+    # Decimate to what the chart width can show: OHLCV buckets for bars and
+    # min/max positions for lines
+    buckets = bucket_count(width_px) if width_px else len(df)
+    if len(df) > buckets:
+        starts, b_open, b_high, b_low, b_close, b_volume = ohlcv_buckets(
+            x, open_, high, low, close, volume if show_volume else np.zeros(len(df)), buckets)
+        bar_x = x[starts]
+    else:
+        bar_x, b_open, b_high, b_low, b_close, b_volume = x, open_, high, low, close, volume
+
+    def line_points(y):
+        if len(y) > 2 * buckets:
+            keep = minmax_positions(y, buckets)
+            return x[keep], y[keep]
+        return x, y
+
+    line_trace = go.Scattergl if min(len(df), 2 * buckets) > WEBGL_THRESHOLD else go.Scatter
+    points = 0
+
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
+                        vertical_spacing=0.03,
+                        row_heights=[0.8, 0.2] if show_volume else [1, 0])
+
+    # Add the price chart
+    if chart_type == "Candlestick":
+        points += len(bar_x)
+        fig.add_trace(go.Candlestick(
+            x=bar_x,
+            open=b_open,
+            high=b_high,
+            low=b_low,
+            close=b_close,
+            name="Price",
+            increasing_line_color='#00ff88',  # Brighter green
+            decreasing_line_color='#ff3333',  # Brighter red
+            increasing_fillcolor='#00ff88',   # Bright green fill
+            decreasing_fillcolor='#ff3333'    # Bright red fill
+        ), row=1, col=1)
+    elif chart_type == "OHLC":
+        points += len(bar_x)
+        fig.add_trace(go.Ohlc(
+            x=bar_x,
+            open=b_open,
+            high=b_high,
+            low=b_low,
+            close=b_close,
+            name="Price",
+            increasing_line_color='#00ff88',  # Brighter green
+            decreasing_line_color='#ff3333'   # Brighter red
+        ), row=1, col=1)
+    else:  # Line chart
+        line_x, line_y = line_points(close)
+        points += len(line_x)
+        fig.add_trace(line_trace(
+            x=line_x,
+            y=line_y,
+            name="Price",
+            line=dict(color='#00ffff', width=2)  # Bright cyan
+        ), row=1, col=1)
+
+    # Add moving averages with more visible colors
+    for column, color, name in (("SMA_9", "#00ffff", "SMA 9"),      # Bright cyan
+                                ("SMA_20", "#ffff00", "SMA 20"),    # Bright yellow
+                                ("SMA_50", "#ff00ff", "SMA 50")):   # Bright magenta
+        line_x, line_y = line_points(df[column].to_numpy(dtype=np.float64))
+        points += len(line_x)
+        fig.add_trace(line_trace(
+            x=line_x,
+            y=line_y,
+            line=dict(color=color, width=2),
+            name=name
+        ), row=1, col=1)
+
+    # Add buy/sell signals with enhanced visibility
+    buy_signals = np.asarray(buy_signals, dtype=np.intp)
+    sell_signals = np.asarray(sell_signals, dtype=np.intp)
+    _add_signals(fig, x[buy_signals], low[buy_signals] * 0.998,  # Slightly below the low for visibility
+                 "#00ff88", "triangle-up", "BUY", "bottom center")
+    _add_signals(fig, x[sell_signals], high[sell_signals] * 1.002,  # Slightly above the high for visibility
+                 "#ff3333", "triangle-down", "SELL", "top center")
+
+    # Add support and resistance levels with enhanced visibility
+    if len(df):
+        _add_levels(fig, x, supports,
+                    "#00ff88", "rgba(0, 255, 136, 0.2)", "Support")
+        _add_levels(fig, x, resistances,
+                    "#ff3333", "rgba(255, 51, 51, 0.2)", "Resistance")
+
+    # Add fair value gaps with enhanced visibility, one trace per direction
+    if fvg_table is not None and len(fvg_table):
+        for gap_type, rgb in (("bullish", "0, 255, 136"), ("bearish", "255, 51, 51")):
+            gaps = fvg_table[fvg_table["type"] == gap_type]
+            if gaps.empty:
+                continue
+            position = gaps["position"].to_numpy()
+            gx, gy = _segments(x, position - 1, position + 1,
+                               gaps["bottom"].to_numpy(), gaps["top"].to_numpy(), closed=True)
+            fig.add_trace(go.Scatter(
+                x=gx, y=gy,
+                mode="lines",
+                fill="toself",
+                fillcolor=f"rgba({rgb}, 0.4)",
+                line=dict(width=1, color=f"rgba({rgb}, 1)"),  # Add border
+                name=f"{gap_type.title()} FVG",
+                showlegend=False,
+                hoverinfo="skip"
+            ), row=1, col=1)
+
+    # Add volume chart with enhanced colors
+    if show_volume:
+        # A two-colour scale over 0/1 avoids validating one colour string per bar
+        points += len(bar_x)
+        fig.add_trace(go.Bar(
+            x=bar_x,
+            y=b_volume,
+            name="Volume",
+            marker=dict(
+                color=(b_close < b_open).astype(np.int8),
+                colorscale=[[0, '#00ff88'], [1, '#ff3333']],  # Bright green / bright red
+                cmin=0,
+                cmax=1
+            ),
+            opacity=0.7  # More opacity
+        ), row=2, col=1)
+
+    _style_figure(fig, title)
+
+    stats = {
+        'bars': len(df),
+        'traces': len(fig.data),
+        'shapes': len(fig.layout.shapes),
+        'points': points,
+        'build_ms': (time.perf_counter() - started) * 1e3,
+    }
+    return fig, stats
+
+
+def figure_json_size(fig):
+    """Return the size in bytes of the figure's JSON payload"""
+    return len(fig.to_json().encode("utf-8"))
+
+
+def _style_figure(fig, title):
+    """Apply the dark TradingView-like layout"""
+    # Update chart layout with enhanced visibility
+    fig.update_layout(
+        title=dict(
+            text=title,
+            font=dict(
+                size=24,
+                color="#ffffff",
+                family="Arial Black"
+            )
+        ),
+        xaxis_title="",
+        yaxis_title=dict(
+            text="Price",
+            font=dict(
+                size=16,
+                color="#ffffff",
+                family="Arial"
+            )
+        ),
+        xaxis_rangeslider_visible=False,
+        height=800,  # Taller chart
+        template="plotly_dark",
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+            font=dict(
+                size=12,
+                color="#ffffff",
+                family="Arial"
+            ),
+            bgcolor="rgba(0, 0, 0, 0.95)",  # Almost pure black background
+            bordercolor="rgba(255, 255, 255, 0.25)",  # Subtle white border
+            borderwidth=1
+        ),
+        margin=dict(l=10, r=10, t=50, b=10),
+        font=dict(
+            family="Arial, sans-serif",
+            size=14,
+            color="#ffffff"
+        ),
+        paper_bgcolor="black",     # Pure black background
+        plot_bgcolor="black",      # Pure black background
+        hovermode="x unified"
+    )
+
+    # Make grid lines more visible
+    axis_style = dict(
+        showgrid=True,
+        gridwidth=1,
+        gridcolor="rgba(255, 255, 255, 0.05)",  # Very subtle white grid
+        showline=True,
+        linewidth=1,
+        linecolor="rgba(255, 255, 255, 0.2)",   # Subtle white lines
+        zeroline=False,
+        title_font=dict(size=14, color="#ffffff"),
+        tickfont=dict(size=12, color="#ffffff")
+    )
+    fig.update_xaxes(**axis_style)
+    fig.update_yaxes(**axis_style)
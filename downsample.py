@@ -0,0 +1,68 @@
+"""Shape-preserving decimation for chart series.
+
+A chart cannot show more than a couple of points per horizontal pixel, so
+long series are reduced before they are sent to the browser.  Candles are
+aggregated into equal-count OHLCV buckets and lines keep each bucket's
+minimum and maximum, so spikes and wicks survive the reduction.
+"""
+import numpy as np
+
+# Roughly two pixels per candle body / per min-max point pair
+PIXELS_PER_BUCKET = 2
+
+
+def bucket_count(width_px):
+    """Number of buckets a chart of ``width_px`` pixels can resolve"""
+    return max(1, int(width_px) // PIXELS_PER_BUCKET)
+
+
+def _bucket_size(n, buckets):
+    return max(1, -(-n // buckets))
+
+
+def _padded(values, size, fill=np.nan):
+    """Reshape a 1-D array into rows of ``size``, padding the last row"""
+    values = np.asarray(values, dtype=np.float64)
+    pad = -len(values) % size
+    if pad:
+        values = np.concatenate([values, np.full(pad, fill)])
+    return values.reshape(-1, size)
+
+
+def ohlcv_buckets(x, open_, high, low, close, volume, buckets):
+    """Aggregate bars into at most ``buckets`` equal-count OHLCV buckets.
+
+    Returns ``(starts, open, high, low, close, volume)`` where ``starts`` are
+    the bar positions each bucket begins at (use ``x[starts]`` for its time).
+    """
+    n = len(x)
+    size = _bucket_size(n, buckets)
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+    with np.errstate(invalid='ignore'):
+        return (
+            starts,
+            np.asarray(open_, dtype=np.float64)[starts],
+            np.fmax.reduce(_padded(high, size), axis=1),
+            np.fmin.reduce(_padded(low, size), axis=1),
+            np.asarray(close, dtype=np.float64)[ends],
+            np.nansum(_padded(volume, size, 0.0), axis=1),
+        )
+
+
+def minmax_positions(y, buckets):
+    """Positions that keep each bucket's min and max, in time order.
+
+    At most ``2 * buckets`` positions are returned; an all-NaN bucket keeps
+    its first bar so the gap stays visible.
+    """
+    n = len(y)
+    size = _bucket_size(n, buckets)
+    rows = _padded(y, size)
+    nan = np.isnan(rows)
+    lo = np.where(nan, np.inf, rows).argmin(axis=1)
+    hi = np.where(nan, -np.inf, rows).argmax(axis=1)
+    offsets = np.arange(0, len(rows) * size, size)
+    pairs = np.sort(np.column_stack([lo, hi]), axis=1) + offsets[:, None]
+    positions = np.unique(pairs.ravel())
+    return positions[positions < n]
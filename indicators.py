@@ -0,0 +1,259 @@
+"""Technical indicators, computed in bulk or updated one bar at a time.
+
+``compute_indicators`` is the vectorized pandas version used on a fresh
+history.  The streaming classes reproduce the same numbers bar by bar in O(1)
+per update, so a live refresh only pays for the bars that were appended.
+Every streaming object can dump its state to a JSON-friendly dict and be
+rebuilt from it, which lets the state outlive a Streamlit rerun or process.
+"""
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+INDICATOR_COLUMNS = ['SMA_9', 'SMA_20', 'SMA_50', 'RSI',
+                     'EMA_12', 'EMA_26', 'MACD', 'MACD_Signal', 'MACD_Hist']
+
+# Only feed MACD; the streaming engine carries their last values in its state
+INTERMEDIATE_COLUMNS = ['EMA_12', 'EMA_26']
+
+
+def rsi(close, period=14):
+    """Simple-average RSI of a close price Series"""
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gain = gain.rolling(window=period).mean()
+    avg_loss = loss.rolling(window=period).mean()
+    rs = avg_gain / avg_loss.where(avg_loss != 0, 0.001)  # Avoid division by zero
+    return 100 - (100 / (1 + rs))
+
+
+def compute_indicators(close):
+    """Compute every indicator column for a close price Series"""
+    out = pd.DataFrame(index=close.index)
+
+    # 1. Simple Moving Averages
+    out['SMA_9'] = close.rolling(window=9).mean()
+    out['SMA_20'] = close.rolling(window=20).mean()
+    out['SMA_50'] = close.rolling(window=50).mean()
+
+    # 2. Relative Strength Index (RSI)
+    out['RSI'] = rsi(close)
+
+    # 3. MACD
+    out['EMA_12'] = close.ewm(span=12, adjust=False).mean()
+    out['EMA_26'] = close.ewm(span=26, adjust=False).mean()
+    out['MACD'] = out['EMA_12'] - out['EMA_26']
+    out['MACD_Signal'] = out['MACD'].ewm(span=9, adjust=False).mean()
+    out['MACD_Hist'] = out['MACD'] - out['MACD_Signal']
+    return out
+
+
+class StreamingSMA:
+    """Simple moving average matching ``Series.rolling(window).mean()``"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+
+    def update(self, value):
+        self.values.append(float(value))
+        if len(self.values) < self.window or any(v != v for v in self.values):
+            return math.nan
+        # fsum keeps the result exact-ish without a drifting running total
+        return math.fsum(self.values) / self.window
+
+    def seed(self, values):
+        """Load state from the tail of a history"""
+        self.values = deque((float(v) for v in values[-self.window:]), maxlen=self.window)
+
+    def to_state(self):
+        return {'window': self.window, 'values': list(self.values)}
+
+    @classmethod
+    def from_state(cls, state):
+        sma = cls(state['window'])
+        sma.values.extend(state['values'])
+        return sma
+
+
+class StreamingEMA:
+    """Exponential moving average matching ``Series.ewm(span, adjust=False).mean()``"""
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = math.nan
+        # Weight of the previous value; it decays further across NaN inputs
+        self.old_weight = 1.0
+
+    def update(self, value):
+        value = float(value)
+        if self.value != self.value:
+            if value == value:
+                self.value = value
+            return self.value
+        self.old_weight *= 1.0 - self.alpha
+        if value == value:
+            if self.value != value:
+                self.value = (self.old_weight * self.value + self.alpha * value) / \
+                    (self.old_weight + self.alpha)
+            self.old_weight = 1.0
+        return self.value
+
+    def seed(self, inputs, outputs):
+        """Load state from a history of inputs and the matching EMA outputs"""
+        inputs = np.asarray(inputs, dtype=np.float64)
+        self.value = float(outputs[-1]) if len(outputs) else math.nan
+        # Trailing NaN inputs have already decayed the previous weight
+        observed = np.flatnonzero(~np.isnan(inputs))
+        trailing_nans = len(inputs) - 1 - observed[-1] if len(observed) else 0
+        self.old_weight = (1.0 - self.alpha) ** trailing_nans
+
+    def to_state(self):
+        return {'span': self.span, 'value': self.value, 'old_weight': self.old_weight}
+
+    @classmethod
+    def from_state(cls, state):
+        ema = cls(state['span'])
+        ema.value = state['value']
+        ema.old_weight = state['old_weight']
+        return ema
+
+
+class StreamingRSI:
+    """Rolling-mean RSI matching the formula in :func:`compute_indicators`"""
+
+    def __init__(self, window=14):
+        self.window = window
+        self.gains = StreamingSMA(window)
+        self.losses = StreamingSMA(window)
+        self.prev_close = math.nan
+
+    def update(self, close):
+        close = float(close)
+        delta = close - self.prev_close
+        self.prev_close = close
+        # A NaN delta counts as neither a gain nor a loss, like Series.where
+        avg_gain = self.gains.update(delta if delta > 0 else 0.0)
+        avg_loss = self.losses.update(-delta if delta < 0 else 0.0)
+        if avg_loss == 0:
+            avg_loss = 0.001
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def seed(self, closes):
+        closes = np.asarray(closes, dtype=np.float64)
+        tail = closes[-(self.window + 1):]
+        # The first bar of a history has no delta; it enters the window as 0
+        delta = np.diff(np.r_[math.nan, tail])[-self.window:]
+        with np.errstate(invalid='ignore'):
+            self.gains.seed(np.where(delta > 0, delta, 0.0))
+            self.losses.seed(np.where(delta < 0, -delta, 0.0))
+        self.prev_close = float(closes[-1]) if len(closes) else math.nan
+
+    def to_state(self):
+        return {'window': self.window, 'gains': self.gains.to_state(),
+                'losses': self.losses.to_state(), 'prev_close': self.prev_close}
+
+    @classmethod
+    def from_state(cls, state):
+        rsi = cls(state['window'])
+        rsi.gains = StreamingSMA.from_state(state['gains'])
+        rsi.losses = StreamingSMA.from_state(state['losses'])
+        rsi.prev_close = state['prev_close']
+        return rsi
+
+
+class IndicatorEngine:
+    """All chart indicators for one series, updated one bar at a time"""
+
+    def __init__(self):
+        self.sma = {window: StreamingSMA(window) for window in (9, 20, 50)}
+        self.rsi = StreamingRSI(14)
+        self.ema_fast = StreamingEMA(12)
+        self.ema_slow = StreamingEMA(26)
+        self.signal = StreamingEMA(9)
+
+    def update(self, close):
+        """Append one close and return the indicator values in INDICATOR_COLUMNS order"""
+        sma9, sma20, sma50 = (self.sma[w].update(close) for w in (9, 20, 50))
+        rsi = self.rsi.update(close)
+        ema12 = self.ema_fast.update(close)
+        ema26 = self.ema_slow.update(close)
+        macd = ema12 - ema26
+        signal = self.signal.update(macd)
+        return (sma9, sma20, sma50, rsi, ema12, ema26, macd, signal, macd - signal)
+
+    def seed(self, close, indicators):
+        """Load state from a close history and its :func:`compute_indicators` output"""
+        closes = np.asarray(close, dtype=np.float64)
+        for sma in self.sma.values():
+            sma.seed(closes)
+        self.rsi.seed(closes)
+        self.ema_fast.seed(closes, indicators['EMA_12'].to_numpy())
+        self.ema_slow.seed(closes, indicators['EMA_26'].to_numpy())
+        self.signal.seed(indicators['MACD'].to_numpy(), indicators['MACD_Signal'].to_numpy())
+
+    def to_state(self):
+        return {
+            'sma': [self.sma[w].to_state() for w in (9, 20, 50)],
+            'rsi': self.rsi.to_state(),
+            'ema_fast': self.ema_fast.to_state(),
+            'ema_slow': self.ema_slow.to_state(),
+            'signal': self.signal.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        engine = cls()
+        engine.sma = {s['window']: StreamingSMA.from_state(s) for s in state['sma']}
+        engine.rsi = StreamingRSI.from_state(state['rsi'])
+        engine.ema_fast = StreamingEMA.from_state(state['ema_fast'])
+        engine.ema_slow = StreamingEMA.from_state(state['ema_slow'])
+        engine.signal = StreamingEMA.from_state(state['signal'])
+        return engine
+
+
+def extend_indicators(close, cached=None, dtype=np.float64):
+    """Return ``(indicators, cache)`` for a close Series, reusing a previous result.
+
+    ``cached`` is the dict returned by the previous call for the same series.
+    Bars up to its last timestamp are taken from it; that last bar (which may
+    have been a partial candle) and everything after are pushed through the
+    streaming engine.  The returned cache holds the engine state from *before*
+    the newest bar, so the next call can revise it.  Without a usable cache
+    the indicators are computed in bulk.
+
+    The returned frame leaves out :data:`INTERMEDIATE_COLUMNS`, shares
+    ``close``'s index and stores its values as ``dtype``; the engine always
+    works in float64, so a float32 cache does not drift across updates.
+    """
+    close = close.astype(np.float64)
+    if cached is not None and len(close):
+        previous = cached['frame']
+        last = previous.index[-1]
+        start = close.index.searchsorted(last)
+        head = previous.loc[close.index[0]:].iloc[:-1]
+        if previous.index[0] <= close.index[0] and start < len(close) and close.index[start] == last \
+                and len(head) == start:
+            engine = IndicatorEngine.from_state(cached['state'])
+            values = close.to_numpy()[start:]
+            rows = []
+            for i, value in enumerate(values):
+                if i == len(values) - 1:
+                    state = engine.to_state()
+                rows.append(engine.update(value))
+            fresh = pd.DataFrame(rows, index=close.index[start:], columns=INDICATOR_COLUMNS)
+            fresh = fresh.drop(columns=INTERMEDIATE_COLUMNS).astype(dtype)
+            frame = pd.concat([head, fresh])
+            frame.index = close.index
+            return frame, {'frame': frame, 'state': state}
+
+    frame = compute_indicators(close)
+    engine = IndicatorEngine()
+    if len(close):
+        engine.seed(close.iloc[:-1], frame.iloc[:-1])
+    frame = frame.drop(columns=INTERMEDIATE_COLUMNS).astype(dtype)
+    return frame, {'frame': frame, 'state': engine.to_state()}
@@ -0,0 +1,144 @@
+"""Running price metrics over a cached frame plus only the newest bars.
+
+The metric row and the latest candle are what change between two ticks of
+live mode.  :class:`LiveBars` reads the cached frame once, folding its
+source bars into candles of the display timeframe and keeping running
+aggregates of the settled ones; every tick merges just the bars downloaded
+(or streamed) since the open (last) bar, so its cost does not grow with the
+length of the period or the number of source bars per candle.
+"""
+from collections import deque
+
+import numpy as np
+
+_BAR_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+def _merge(candle, bar):
+    """Extend a ``(start, open, high, low, close, volume)`` candle (or None) by a bar"""
+    if candle is None:
+        return bar
+    return (candle[0], candle[1], np.fmax(candle[2], bar[2]), np.fmin(candle[3], bar[3]),
+            bar[4], candle[5] + bar[5])
+
+
+class LiveBars:
+    """Market stats of display candles over a canonical frame that keeps growing at the end.
+
+    The frame holds source bars; ``step`` is the display candle width and
+    ``bin_start`` the start of any display candle (e.g. the last one of the
+    resampled frame), later candles following on the same grid.  Without a
+    ``step`` every source bar is a candle.  ``window`` is the number of
+    trailing candles, open one included, that the high/low/volume stats
+    cover (None = the whole frame), matching ``df.iloc[-window:]`` on the
+    resampled frame.  Candles are ``(start, open, high, low, close, volume)``.
+    """
+
+    def __init__(self, frame, window=None, bin_start=None, step=None):
+        self.window = window
+        self._origin = (frame.index[-1] if bin_start is None else bin_start).value
+        self._step = None if step is None else step.value
+        self.candles = deque(maxlen=max((window or 2) - 1, 1))
+        self._window_high = self._window_low = np.nan
+        self._window_volume = 0
+        # Candles settled since construction, for callers that act once per candle
+        self.settled = 0
+
+        # Only the candles the stats can still reach are folded bar by bar
+        stamps = frame.index.as_unit('ns').asi8
+        bins = stamps if self._step is None else self._bin(stamps)
+        starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        first = int(starts[-min(len(starts), (window or 1) + 1)])
+        settled = frame.iloc[:first]
+        self.high = np.fmax.reduce(settled['High'].to_numpy()) if len(settled) else np.nan
+        self.low = np.fmin.reduce(settled['Low'].to_numpy()) if len(settled) else np.nan
+        self.volume = int(settled['Volume'].to_numpy().sum())
+
+        tail = frame.iloc[first:]
+        rows = zip(tail.index, *(tail[col].tolist() for col in _BAR_COLUMNS))
+        self._bar = next(rows)
+        self._head = None
+        self._open_candle(self._bar[0])
+        for row in rows:
+            self.push_bar(*row)
+
+    def _open_candle(self, time):
+        self._start = self._bin(time.value)
+        self._start_time = time - np.timedelta64(time.value - self._start, 'ns')
+
+    def _bin(self, stamp_ns):
+        if self._step is None:
+            return stamp_ns
+        return self._origin + (stamp_ns - self._origin) // self._step * self._step
+
+    @property
+    def open_time(self):
+        """Start of the last source bar, which may still be forming"""
+        return self._bar[0]
+
+    def push_bar(self, time, open_, high, low, close, volume):
+        """Add a new bar or revise the open one; bars before the open one are ignored"""
+        bar = (time, open_, high, low, close, int(volume))
+        last = self._bar
+        if time < last[0]:
+            return False
+        if time > last[0]:
+            # The previous open bar is complete; so is its candle if this bar starts a new one
+            if self._bin(time.value) == self._start:
+                self._head = _merge(self._head, last)
+            else:
+                self._settle((self._start_time,) + _merge(self._head, last)[1:])
+                self._head = None
+                self._open_candle(time)
+        self._bar = bar
+        return True
+
+    def _settle(self, candle):
+        self.settled += 1
+        self.high = np.fmax(self.high, candle[2])
+        self.low = np.fmin(self.low, candle[3])
+        self.volume += candle[5]
+        self.candles.append(candle)
+        if self.window:
+            # Once per candle, not per tick: the trailing window minus the open candle
+            held = list(self.candles)[-(self.window - 1):] if self.window > 1 else []
+            self._window_high = np.fmax.reduce([c[2] for c in held]) if held else np.nan
+            self._window_low = np.fmin.reduce([c[3] for c in held]) if held else np.nan
+            self._window_volume = sum(c[5] for c in held)
+
+    def update(self, latest):
+        """Merge bars downloaded from :attr:`open_time` on; returns whether any arrived"""
+        if latest is None or latest.empty:
+            return False
+        changed = False
+        for row in zip(latest.index, *(latest[col].tolist() for col in _BAR_COLUMNS)):
+            changed |= self.push_bar(*row)
+        return changed
+
+    def stats(self):
+        """Current price, change from the previous candle's close, high, low and volume"""
+        candle = _merge(self._head, self._bar)
+        current_price = float(candle[4])
+        price_change = (current_price / self.candles[-1][4] - 1) * 100 if self.candles else np.nan
+        if self.window:
+            high = np.fmax(self._window_high, candle[2])
+            low = np.fmin(self._window_low, candle[3])
+            volume = self._window_volume + candle[5]
+        else:
+            high = np.fmax(self.high, candle[2])
+            low = np.fmin(self.low, candle[3])
+            volume = self.volume + candle[5]
+        return {'time': self._bar[0], 'current_price': current_price, 'price_change': price_change,
+                'high': float(high), 'low': float(low), 'volume': int(volume)}
+
+    def candle(self):
+        """Open/high/low/close/volume of the display candle that holds the open bar"""
+        candle = _merge(self._head, self._bar)
+        return {
+            'time': self._start_time,
+            'Open': float(candle[1]),
+            'High': float(candle[2]),
+            'Low': float(candle[3]),
+            'Close': float(candle[4]),
+            'Volume': int(candle[5]),
+        }
@@ -0,0 +1,411 @@
+"""On-disk OHLCV store with incremental (delta) refresh.
+
+Bars are kept per (symbol, interval) as one flat binary array per column
+plus a small ``meta.json`` that says how many rows are committed.  A refresh
+only downloads the bars from the last stored timestamp on and writes them
+over the tail of each column file, so its network and disk cost grow with
+the number of new candles instead of the length of the stored history; in
+memory the merged frame is rebuilt with one contiguous copy of each column.
+"""
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Canonical bar schema: float64 prices and int64 volume on a UTC index
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+PRICE_COLUMNS = OHLCV_COLUMNS[:4]
+
+# On-disk column dtypes; every column file is a flat array of these
+_COLUMN_DTYPES = {"Open": np.float64, "High": np.float64, "Low": np.float64, "Close": np.float64,
+                  "Volume": np.int64}
+
+# float32 resolves cents below 2**17: its spacing there is under half a cent
+COMPACT_PRICE_LIMIT = 2.0 ** 17
+
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+
+def period_start(period, now=None):
+    """Return the UTC timestamp a yfinance-style period string reaches back to.
+
+    ``None`` means the period is unbounded ("max").
+    """
+    if period in (None, "max"):
+        return None
+    match = _PERIOD_RE.match(period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    count, unit = int(match.group(1)), match.group(2)
+    now = pd.Timestamp.now(tz="UTC") if now is None else now
+    if unit == "d":
+        return now - pd.Timedelta(days=count)
+    if unit == "wk":
+        return now - pd.Timedelta(weeks=count)
+    if unit == "mo":
+        return now - pd.DateOffset(months=count)
+    return now - pd.DateOffset(years=count)
+
+
+def normalize_ohlcv(data):
+    """Convert downloaded bars into the canonical frame, once at ingest.
+
+    yfinance's (Price, Ticker) columns are flattened and the result has
+    exactly :data:`OHLCV_COLUMNS`: float64 prices and int64 volume (missing
+    volume is 0), each in its own contiguous array, on a sorted, unique UTC
+    index named ``Datetime``.  Rows without any price are dropped.
+    Everything downstream reads columns as plain arrays and never has to
+    unwrap or copy.
+    """
+    if data is None or data.empty:
+        return data
+    if isinstance(data.columns, pd.MultiIndex):
+        data = data.set_axis(data.columns.get_level_values(0), axis=1)
+    prices = {col: data[col].to_numpy(dtype=np.float64) for col in PRICE_COLUMNS}
+    volume = data["Volume"].to_numpy(dtype=np.float64) if "Volume" in data.columns \
+        else np.zeros(len(data))
+    index = pd.DatetimeIndex(data.index)
+    index = index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+
+    keep = np.zeros(len(data), dtype=bool)
+    for values in prices.values():
+        keep |= ~np.isnan(values)
+    stamps = index.asi8
+    if np.all(stamps[1:] > stamps[:-1]):
+        rows = np.flatnonzero(keep)
+    else:
+        # Last occurrence of a timestamp wins: a re-downloaded candle replaces the partial one
+        keep &= ~index.duplicated(keep="last")
+        rows = np.flatnonzero(keep)
+        rows = rows[np.argsort(stamps[rows], kind="stable")]
+
+    frame = {col: values[rows] for col, values in prices.items()}
+    frame["Volume"] = np.nan_to_num(volume[rows]).astype(np.int64)
+    return pd.DataFrame(frame, index=index[rows].rename("Datetime"), copy=False)
+
+
+def compact_ohlcv(frame):
+    """Return a canonical frame with float32 prices, for caches holding many keys.
+
+    float32 carries about seven significant digits: prices below
+    :data:`COMPACT_PRICE_LIMIT` still round to the same cent, and every
+    consumer upcasts to float64 before computing, so only storage shrinks
+    (by a third, index included).  Frames with higher prices are returned
+    unchanged rather than lose cents.
+    """
+    if frame is None or frame.empty:
+        return frame
+    if max(np.nanmax(np.abs(frame[col].to_numpy())) for col in PRICE_COLUMNS) >= COMPACT_PRICE_LIMIT:
+        return frame
+    return frame.astype({col: np.float32 for col in PRICE_COLUMNS})
+
+
+def frame_nbytes(frame):
+    """Return ``(bytes held, bytes as all-float64)`` for a frame and its index"""
+    if frame is None:
+        return 0, 0
+    held = int(frame.memory_usage(index=True, deep=True).sum())
+    return held, 8 * len(frame) * (len(frame.columns) + 1)
+
+
+def _index_to_utc_ns(index):
+    """Return the index as int64 nanoseconds since the epoch (UTC)"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    return index.tz_convert("UTC").as_unit("ns").asi8.copy()
+
+
+def _key_dir(symbol, interval):
+    """Filesystem-safe directory name for a (symbol, interval) key"""
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{symbol}__{interval}")
+    return safe
+
+
+class MarketDataStore:
+    """Columnar bar store keyed by symbol and interval.
+
+    ``max_rows`` caps the bars kept per key beyond the requested period
+    (one number, or ``{interval: number}`` with unlisted intervals
+    uncapped): once a quarter of that many can go, the oldest bars are
+    dropped (and requests reaching further back fetch in full again).  The last frame of
+    up to ``max_frames`` keys stays in memory, least recently used out
+    first; with ``compact`` those (and every frame returned) have float32
+    prices (see :func:`compact_ohlcv`), while the files keep float64.
+    Returned frames are views of the in-memory ones, so callers caching
+    them add no copy of their own.
+    """
+
+    def __init__(self, root, max_rows=None, compact=False, max_frames=16):
+        self.root = root
+        self.max_rows = max_rows
+        self.compact = compact
+        self.max_frames = max_frames
+        # Foreground reruns and the background refresher share one store
+        self._lock = threading.RLock()
+        # (symbol, interval) -> ((meta version, rows), frame) of the last frame read or written
+        self._frames = OrderedDict()
+
+    def _path(self, symbol, interval, name=""):
+        return os.path.join(self.root, _key_dir(symbol, interval), name)
+
+    def _read_meta(self, symbol, interval):
+        try:
+            with open(self._path(symbol, interval, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, symbol, interval, meta):
+        # Replaced atomically: the rows it lists are always fully on disk
+        tmp = self._path(symbol, interval, ".meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path(symbol, interval, "meta.json"))
+
+    def load(self, symbol, interval):
+        """Return ``(frame, meta)`` for a key, or ``(None, None)`` if absent/corrupt"""
+        meta = self._read_meta(symbol, interval)
+        if meta is None:
+            return None, None
+        if meta.get("layout") != "append" or \
+                any(col not in meta.get("columns", ()) for col in OHLCV_COLUMNS):
+            # Written before the canonical, append-only layout; refetch
+            return None, None
+        key = (symbol, interval)
+        cached = self._frames.get(key)
+        if cached is not None and cached[0] == (meta["version"], meta["rows"]):
+            self._frames.move_to_end(key)
+            return cached[1], meta
+
+        try:
+            arrays = self._read_rows(symbol, interval, 0, meta["rows"])
+        except (OSError, ValueError):
+            # Files shorter than the meta says: damaged outside the store; refetch
+            return None, None
+        return self._remember(key, meta, self._in_memory(self._to_frame(arrays))), meta
+
+    def _read_rows(self, symbol, interval, start, stop):
+        """Column arrays (``index`` in ns) of the stored rows ``[start, stop)``"""
+        arrays = {}
+        for name, dtype in [("index", np.int64)] + list(_COLUMN_DTYPES.items()):
+            arrays[name] = np.fromfile(self._path(symbol, interval, f"{name}.bin"), dtype=dtype,
+                                       count=stop - start, offset=start * np.dtype(dtype).itemsize)
+            if len(arrays[name]) != stop - start:
+                raise ValueError(f"{name}.bin is shorter than its meta.json")
+        return arrays
+
+    def _to_frame(self, arrays):
+        index = pd.DatetimeIndex(arrays["index"].view("M8[ns]"), name="Datetime").tz_localize("UTC")
+        return pd.DataFrame({col: arrays[col] for col in _COLUMN_DTYPES}, index=index, copy=False)
+
+    def _in_memory(self, frame):
+        """``frame`` as it is held in memory and returned"""
+        return compact_ohlcv(frame) if self.compact else frame
+
+    def _remember(self, key, meta, frame):
+        """Keep ``frame`` as the in-memory copy of ``key``, evicting the least recently used"""
+        self._frames[key] = ((meta["version"], meta["rows"]), frame)
+        self._frames.move_to_end(key)
+        while len(self._frames) > self.max_frames:
+            self._frames.popitem(last=False)
+        return frame
+
+    def memory(self, sizeof):
+        """Return ``{key: sizeof(frame)}`` for every frame held in memory"""
+        with self._lock:
+            frames = {key: frame for key, (_, frame) in self._frames.items()}
+        return {key: sizeof(frame) for key, frame in frames.items()}
+
+    def holds(self, frame):
+        """Whether ``frame`` shares its prices with a frame held in memory (e.g. a returned view)"""
+        if frame is None or frame.empty:
+            return False
+        close = frame["Close"].to_numpy()
+        with self._lock:
+            return any(np.may_share_memory(close, held["Close"].to_numpy())
+                       for _, held in self._frames.values())
+
+    def save(self, symbol, interval, frame, coverage_start, from_row=0):
+        """Persist a frame; ``coverage_start`` is the earliest time it is complete from.
+
+        Rows before ``from_row`` must already be stored unchanged: only the
+        rest is written, over the old tail of each column file, so a delta
+        refresh costs the new bars rather than the whole history.  Returns
+        the frame as held in memory.
+        """
+        meta = self._write(symbol, interval, frame.iloc[from_row:], from_row, len(frame), coverage_start)
+        return self._remember((symbol, interval), meta, self._in_memory(frame))
+
+    def _write(self, symbol, interval, tail, from_row, rows, coverage_start):
+        """Write ``tail`` as rows ``from_row`` on and commit ``rows`` rows; returns the new meta"""
+        key_dir = self._path(symbol, interval)
+        os.makedirs(key_dir, exist_ok=True)
+        meta = self._read_meta(symbol, interval) or {}
+        if meta.get("layout") != "append":
+            from_row = 0
+            # Column files of the old whole-rewrite layout
+            for name in os.listdir(key_dir):
+                if name.endswith(".npy"):
+                    os.remove(os.path.join(key_dir, name))
+        version = meta.get("version", 0) + 1
+
+        if from_row < meta.get("rows", 0):
+            # Shrink the committed rows first: a crash while the tail is being
+            # rewritten then leaves a consistent prefix behind
+            self._write_meta(symbol, interval, {**meta, "rows": from_row, "version": version})
+
+        arrays = {"index": _index_to_utc_ns(tail.index)}
+        arrays.update({col: np.ascontiguousarray(tail[col].to_numpy(), dtype=dtype)
+                       for col, dtype in _COLUMN_DTYPES.items()})
+        for name, values in arrays.items():
+            path = os.path.join(key_dir, f"{name}.bin")
+            with open(path, "r+b" if from_row and os.path.exists(path) else "wb") as f:
+                f.seek(from_row * values.itemsize)
+                values.tofile(f)
+                f.truncate()
+
+        meta = {
+            "layout": "append",
+            "version": version,
+            "rows": rows,
+            "columns": list(_COLUMN_DTYPES),
+            "coverage_start": None if coverage_start is None else int(coverage_start.value),
+        }
+        self._write_meta(symbol, interval, meta)
+        return meta
+
+    def _plan(self, symbol, interval, window_start):
+        """Return ``(stored, meta, full_fetch)`` for one key"""
+        stored, meta = self.load(symbol, interval)
+        full_fetch = stored is None or stored.empty
+        if not full_fetch:
+            coverage = meta.get("coverage_start")
+            last_ns = int(_index_to_utc_ns(stored.index[-1:])[0])
+            if window_start is None:
+                # "max" is only served from disk if it was fetched as "max" before
+                full_fetch = coverage is not None
+            else:
+                full_fetch = (coverage is not None and window_start.value < coverage) or \
+                    last_ns < window_start.value
+        return stored, meta, full_fetch
+
+    def _merge(self, symbol, interval, window_start, stored, meta, full_fetch, fetched):
+        """Merge downloaded bars into the stored ones, persist and trim to the window"""
+        fetched = normalize_ohlcv(fetched)
+        if full_fetch:
+            if fetched is None or fetched.empty:
+                return None
+            data = self.save(symbol, interval, fetched, window_start)
+        else:
+            data = stored
+            if fetched is not None and not fetched.empty:
+                # Downloaded bars replace the stored ones from their first timestamp on
+                # (usually just the last, possibly partial, candle); the files get the
+                # downloaded float64 values, memory the (possibly compact) merged frame
+                from_row = int(stored.index.searchsorted(fetched.index[0]))
+                coverage_start = None if meta.get("coverage_start") is None \
+                    else pd.Timestamp(meta["coverage_start"], tz="UTC")
+                meta = self._write(symbol, interval, fetched, from_row, from_row + len(fetched),
+                                   coverage_start)
+                new = self._in_memory(fetched)
+                data = self._remember((symbol, interval), meta, pd.DataFrame({
+                    col: np.concatenate([stored[col].to_numpy()[:from_row], new[col].to_numpy()])
+                    for col in OHLCV_COLUMNS
+                }, index=stored.index[:from_row].append(fetched.index.as_unit(stored.index.unit)),
+                    copy=False))
+
+        max_rows = self.max_rows.get(interval) if isinstance(self.max_rows, dict) else self.max_rows
+        if max_rows and window_start is not None:
+            # Drop the oldest bars, never ones inside the requested window; trimming
+            # rewrites the key, so it waits until a quarter of max_rows can go
+            first = min(len(data) - max_rows, int(data.index.searchsorted(window_start)))
+            if first >= max_rows // 4:
+                data = self._trim(symbol, interval, first, len(data))
+
+        if window_start is not None:
+            data = data.iloc[data.index.searchsorted(window_start):]
+        return data
+
+    def _trim(self, symbol, interval, first, rows):
+        """Drop the stored rows before ``first``, rewriting the rest from the files"""
+        frame = self._to_frame(self._read_rows(symbol, interval, first, rows))
+        return self.save(symbol, interval, frame, frame.index[0])
+
+    def fetch(self, symbol, interval, period, download):
+        """Return bars for ``period``, downloading only what is not stored yet.
+
+        ``download(ticker, interval, period=None, start=None)`` is the network
+        call; it is made with ``period`` for a full fetch and with ``start`` set
+        to the last stored bar for a delta fetch.
+        """
+        window_start = period_start(period)
+        with self._lock:
+            stored, meta, full_fetch = self._plan(symbol, interval, window_start)
+        if full_fetch:
+            fetched = download(symbol, interval, period=period)
+        else:
+            # Re-request the last stored bar too: it may have been a partial candle
+            fetched = download(symbol, interval, start=stored.index[-1])
+        with self._lock:
+            return self._merge(symbol, interval, window_start, stored, meta, full_fetch, fetched)
+
+    def fetch_many(self, symbols, interval, period, download, batch=True, max_workers=8):
+        """Fetch several symbols, returning ``{symbol: frame or None}``.
+
+        With ``batch`` the download callable must accept a list of tickers
+        and return yfinance-style (Price, Ticker) columns; symbols needing a
+        full fetch share one request and those needing a delta share another
+        (starting at the oldest of their last bars).  Otherwise each symbol is
+        fetched on a bounded thread pool.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        if not batch:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = {s: pool.submit(self.fetch, s, interval, period, download) for s in symbols}
+            results = {}
+            for symbol, future in futures.items():
+                try:
+                    results[symbol] = future.result()
+                except Exception:
+                    results[symbol] = None
+            return results
+
+        window_start = period_start(period)
+        with self._lock:
+            plans = {s: self._plan(s, interval, window_start) for s in symbols}
+        full = [s for s, plan in plans.items() if plan[2]]
+        delta = [s for s, plan in plans.items() if not plan[2]]
+
+        downloaded = {}
+        if full:
+            downloaded.update(split_tickers(download(full, interval, period=period), full))
+        if delta:
+            start = min(plans[s][0].index[-1] for s in delta)
+            downloaded.update(split_tickers(download(delta, interval, start=start), delta))
+
+        with self._lock:
+            return {
+                s: self._merge(s, interval, window_start, *plans[s], downloaded.get(s))
+                for s in symbols
+            }
+
+
+def split_tickers(data, symbols):
+    """Split a multi-ticker yfinance frame into ``{symbol: frame}``"""
+    if data is None or data.empty:
+        return {}
+    if not isinstance(data.columns, pd.MultiIndex):
+        # A single requested ticker may come back with flat columns
+        return {symbols[0]: data} if len(symbols) == 1 else {}
+    level = data.columns.names.index("Ticker") if "Ticker" in data.columns.names else 1
+    tickers = set(data.columns.get_level_values(level))
+    return {
+        s: data.xs(s, axis=1, level=level).dropna(how="all")
+        for s in symbols if s in tickers
+    }
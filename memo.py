@@ -0,0 +1,90 @@
+"""In-memory memoization of analysis results keyed by a data fingerprint.
+
+A rerun that only changes presentation (chart type, volume pane, the AI
+analysis selection) sees the same bars as the previous one.  Every derived
+result - indicators, signals, levels, gaps, figures - is cached under the
+stage name, the fingerprint of the bars it was computed from and the
+parameters that affect it, so such a rerun only rebuilds the stages whose
+parameters changed.
+
+Cached values are shared, not copied: callers must treat them as read-only,
+as they already do with the frames served by the bar store.
+"""
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+# id(frame) -> fingerprint, dropped when the frame is garbage collected
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def frame_fingerprint(frame):
+    """Return a content hash of a frame's index and columns.
+
+    Frames are never modified in place, so the hash is computed once per
+    frame object; serving the same cached frame again costs a dict lookup.
+    """
+    key = id(frame)
+    with _fingerprints_lock:
+        fingerprint = _fingerprints.get(key)
+    if fingerprint is not None:
+        return fingerprint
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(frame.index.asi8).view(np.uint8))
+    for col in frame.columns:
+        digest.update(str(col).encode("utf-8"))
+        values = frame[col].to_numpy()
+        digest.update(values.dtype.str.encode("ascii"))
+        digest.update(np.ascontiguousarray(values).view(np.uint8))
+    fingerprint = digest.hexdigest()
+    with _fingerprints_lock:
+        _fingerprints[key] = fingerprint
+    weakref.finalize(frame, _forget, key)
+    return fingerprint
+
+
+def _forget(key):
+    with _fingerprints_lock:
+        _fingerprints.pop(key, None)
+
+
+class DerivedCache:
+    """Thread-safe LRU of computed results, with hit/miss counts per stage"""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+
+    def get_or_compute(self, stage, fingerprint, params, compute):
+        """Return the cached ``compute()`` result for ``(stage, fingerprint, params)``.
+
+        ``params`` must be hashable.  Concurrent misses for the same key may
+        both compute; the last result wins, which is harmless for pure stages.
+        """
+        key = (stage, fingerprint, params)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits[stage] = self.hits.get(stage, 0) + 1
+                return self._entries[key]
+            self.misses[stage] = self.misses.get(stage, 0) + 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": dict(self.hits),
+                    "misses": dict(self.misses)}
@@ -0,0 +1,206 @@
+"""Headless analysis pipeline and batch entry point.
+
+Runs the same indicators, support/resistance levels, fair value gaps and
+signals as the dashboard, without Streamlit, over any number of symbols:
+
+    python -m pipeline BTC-USD ETH-USD SOL-USD --interval 60m --period 1mo
+    python -m pipeline --symbols-file symbols.txt --workers 8 --out results
+
+Bars are downloaded into the shared bar store with batched requests first;
+the analysis then runs on a process pool, one symbol per task, with each
+worker reading its bars straight from the store's column files.  Results go to
+``<out>/<symbol>/<interval>/`` as Parquet (or JSON) plus ``signals.json``,
+and a ``summary.json`` per run.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from analysis import fair_value_gap_table, generate_signals, support_resistance_levels, track_gap_fills
+from indicators import compute_indicators
+from market_store import MarketDataStore, _index_to_utc_ns, period_start
+from providers import PROVIDERS, get_provider, store_root
+from resample import resample_ohlcv, source_interval
+
+FORMATS = ("parquet", "json")
+
+
+def analyze_frame(df):
+    """Run the full analysis on one OHLCV frame.
+
+    Returns a dict with ``bars`` (the frame joined with its indicators),
+    ``levels``, ``gaps`` (with fill tracking) and ``signals``
+    (``{name: positions}``).
+    """
+    bars = df.join(compute_indicators(df['Close']))
+    return {
+        'bars': bars,
+        'levels': support_resistance_levels(bars),
+        'gaps': track_gap_fills(bars, fair_value_gap_table(bars)),
+        'signals': generate_signals(bars),
+    }
+
+
+def _signal_records(bars, signals):
+    close = bars['Close'].to_numpy()
+    return {
+        name: [
+            {'position': int(p), 'datetime': bars.index[p].isoformat(), 'price': float(close[p])}
+            for p in positions
+        ]
+        for name, positions in signals.items()
+    }
+
+
+def write_results(results, out_dir, fmt="parquet"):
+    """Write an :func:`analyze_frame` result into ``out_dir``"""
+    os.makedirs(out_dir, exist_ok=True)
+    for name in ('bars', 'levels', 'gaps'):
+        frame = results[name]
+        if fmt == "parquet":
+            frame.to_parquet(os.path.join(out_dir, f"{name}.parquet"))
+        else:
+            frame.to_json(os.path.join(out_dir, f"{name}.json"), orient="split", date_format="iso")
+    with open(os.path.join(out_dir, "signals.json"), "w") as f:
+        json.dump(_signal_records(results['bars'], results['signals']), f)
+
+
+def _output_dir(out_root, symbol, interval):
+    return os.path.join(out_root, re.sub(r"[^A-Za-z0-9_.-]", "_", symbol), interval)
+
+
+def load_stored_bars(store, symbol, interval, period):
+    """Read ``interval`` bars for ``period`` from the store without downloading.
+
+    Uses the finer interval :func:`resample.source_interval` would download
+    when it is stored, otherwise bars stored at ``interval`` itself.
+    """
+    source = source_interval(interval, period)
+    df, _ = store.load(symbol, source)
+    if (df is None or df.empty) and source != interval:
+        # Nothing finer on disk; use bars stored at the interval itself
+        source = interval
+        df, _ = store.load(symbol, source)
+    if df is None or df.empty:
+        raise LookupError(f"no stored {source} bars")
+    window_start = period_start(period)
+    if window_start is not None:
+        df = df[_index_to_utc_ns(df.index) >= window_start.value]
+    if source != interval:
+        df = resample_ohlcv(df, interval)
+    if df.empty:
+        raise LookupError(f"no bars within {period}")
+    return df
+
+
+def analyze_symbol(symbol, interval, period, store_dir, out_root, fmt="parquet"):
+    """Analyse one symbol from the bar store and write its results.
+
+    Runs in a worker process, so it only takes picklable arguments and
+    returns a small summary dict instead of the frames.
+    """
+    started = time.perf_counter()
+    summary = {'symbol': symbol, 'interval': interval, 'period': period}
+    try:
+        df = load_stored_bars(MarketDataStore(store_dir), symbol, interval, period)
+        results = analyze_frame(df)
+        write_results(results, _output_dir(out_root, symbol, interval), fmt)
+        summary.update({
+            'bars': len(df),
+            'first': df.index[0].isoformat(),
+            'last': df.index[-1].isoformat(),
+            'levels': len(results['levels']),
+            'gaps': len(results['gaps']),
+            'unfilled_gaps': int((results['gaps']['status'] != 'filled').sum()),
+            **{name: len(positions) for name, positions in results['signals'].items()},
+        })
+    except Exception as e:
+        summary['error'] = f"{type(e).__name__}: {e}"
+    summary['seconds'] = time.perf_counter() - started
+    return summary
+
+
+def run_batch(symbols, interval, period, out_root, store_dir=".market_store",
+              fmt="parquet", workers=None, fetch=True, provider=None):
+    """Fetch (unless ``fetch`` is false) and analyse every symbol.
+
+    ``provider`` is a :mod:`providers` instance (default: from the
+    environment); its bars live in their own directory under ``store_dir``.
+    Returns the per-symbol summaries in input order.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    provider = provider or get_provider()
+    store_dir = store_root(store_dir, provider)
+    if fetch:
+        store = MarketDataStore(store_dir)
+        store.fetch_many(symbols, source_interval(interval, period), period, provider.download)
+
+    workers = workers or os.cpu_count() or 1
+    summaries = {}
+    if workers == 1:
+        for symbol in symbols:
+            summaries[symbol] = analyze_symbol(symbol, interval, period, store_dir, out_root, fmt)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(symbols) or 1)) as pool:
+            futures = {
+                pool.submit(analyze_symbol, symbol, interval, period, store_dir, out_root, fmt): symbol
+                for symbol in symbols
+            }
+            for future in as_completed(futures):
+                summaries[futures[future]] = future.result()
+    return [summaries[symbol] for symbol in symbols]
+
+
+def _read_symbols(path):
+    with open(path) as f:
+        return [line.split("#")[0].strip() for line in f if line.split("#")[0].strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the chart analysis over many symbols")
+    parser.add_argument("symbols", nargs="*", help="ticker symbols, e.g. BTC-USD AAPL")
+    parser.add_argument("--symbols-file", help="file with one symbol per line")
+    parser.add_argument("--interval", default="60m", help="bar interval (1m, 5m, 15m, 60m, 1d)")
+    parser.add_argument("--period", default="1mo", help="yfinance-style period (5d, 1mo, 1y, max)")
+    parser.add_argument("--out", default="analysis_output", help="output directory")
+    parser.add_argument("--store", default=os.environ.get("MARKET_STORE_DIR", ".market_store"),
+                        help="bar store directory shared with the dashboard")
+    parser.add_argument("--provider", choices=list(PROVIDERS),
+                        default=os.environ.get("MARKET_DATA_PROVIDER", "yfinance"))
+    parser.add_argument("--format", choices=FORMATS, default="parquet")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPUs)")
+    parser.add_argument("--no-fetch", action="store_true",
+                        help="analyse only what is already in the bar store")
+    args = parser.parse_args(argv)
+
+    symbols = list(args.symbols)
+    if args.symbols_file:
+        symbols += _read_symbols(args.symbols_file)
+    if not symbols:
+        parser.error("no symbols given")
+
+    started = time.perf_counter()
+    summaries = run_batch(symbols, args.interval, args.period, args.out, args.store,
+                          args.format, args.workers, fetch=not args.no_fetch,
+                          provider=get_provider(args.provider))
+    elapsed = time.perf_counter() - started
+
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "summary.json"), "w") as f:
+        json.dump({'seconds': elapsed, 'symbols': summaries}, f, indent=2)
+
+    failed = [s for s in summaries if 'error' in s]
+    for s in failed:
+        print(f"{s['symbol']}: {s['error']}", file=sys.stderr)
+    bars = sum(s.get('bars', 0) for s in summaries)
+    print(f"Analysed {len(summaries) - len(failed)}/{len(summaries)} symbols "
+          f"({bars:,} bars) in {elapsed:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Stale-while-revalidate market data with a background refresher.
+
+Foreground reruns always get the last good frame for a key immediately.  A
+daemon thread re-fetches every recently used key shortly before its TTL runs
+out, so the network is only waited on for the very first load of a key.
+"""
+import threading
+import time
+
+
+class BackgroundRefresher:
+    """Serve cached frames and refresh active keys ahead of expiry"""
+
+    def __init__(self, fetch, ttl=60, lead=10, idle_timeout=600, poll_interval=1.0):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.lead = lead
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # Metrics
+        self.refreshes = 0
+        self.failures = 0
+        self.last_lag = None
+        self.last_staleness = None
+        self.max_staleness = 0.0
+
+    def get(self, *key):
+        """Return the frame for ``key``, fetching in the foreground only if none is cached"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["last_access"] = now
+                staleness = now - entry["fetched_at"]
+                self.last_staleness = staleness
+                self.max_staleness = max(self.max_staleness, staleness)
+                frame = entry["frame"]
+        if entry is None:
+            frame = self.fetch(*key)
+            if frame is None:
+                return None
+            with self._lock:
+                self._entries[key] = {"frame": frame, "fetched_at": time.time(), "last_access": now}
+                self.last_staleness = 0.0
+        self._ensure_thread()
+        return frame
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="market-data-prefetch",
+                                                daemon=True)
+                self._thread.start()
+
+    def _due_keys(self, now):
+        with self._lock:
+            for key in [k for k, e in self._entries.items()
+                        if now - e["last_access"] > self.idle_timeout]:
+                # Nobody is looking at this chart any more; stop refreshing it
+                del self._entries[key]
+            return [(key, e["fetched_at"]) for key, e in self._entries.items()
+                    if now - e["fetched_at"] >= self.ttl - self.lead
+                    and now >= e.get("retry_at", 0)]
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            for key, fetched_at in self._due_keys(time.time()):
+                try:
+                    frame = self.fetch(*key)
+                except Exception:
+                    frame = None
+                finished = time.time()
+                with self._lock:
+                    if frame is None:
+                        # Keep serving the last good frame and retry a little later
+                        self.failures += 1
+                        if key in self._entries:
+                            self._entries[key]["retry_at"] = finished + self.lead
+                        continue
+                    if key in self._entries:
+                        self._entries[key]["frame"] = frame
+                        self._entries[key]["fetched_at"] = finished
+                    self.refreshes += 1
+                    # Negative lag means the new data landed before the old expired
+                    self.last_lag = finished - (fetched_at + self.ttl)
+
+    def memory(self, sizeof):
+        """Return ``{key: sizeof(frame)}`` for every cached key"""
+        with self._lock:
+            frames = {key: entry["frame"] for key, entry in self._entries.items()}
+        return {key: sizeof(frame) for key, frame in frames.items()}
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "active_keys": len(self._entries),
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "last_lag_s": self.last_lag,
+                "last_staleness_s": self.last_staleness,
+                "max_staleness_s": self.max_staleness,
+            }
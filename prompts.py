@@ -0,0 +1,359 @@
+"""Prompts and the local fallback for the AI market analysis.
+
+``build_prompt_context`` turns an indicator-enriched OHLCV frame into the
+text blocks and headline numbers the analysis is made of;
+``build_chat_request`` wraps them into the chat completion request and
+``local_analysis`` writes the indicator-only report used when the API is
+unavailable.  Nothing here needs Streamlit or an API client, so prompts can
+be built, benchmarked and cached from batch jobs too.
+"""
+from analysis import OpenGapIndex, fair_value_gap_records, find_support_resistance, unfilled_fair_value_gaps
+
+
+def _last(data, column):
+    """Last value of an optional indicator column as a float, or None"""
+    return float(data[column].to_numpy()[-1]) if column in data.columns else None
+
+
+def build_prompt_context(data, symbol):
+    """Return the prompt text blocks and the values they were built from.
+
+    ``data`` is a canonical OHLCV frame (see :func:`market_store.normalize_ohlcv`)
+    joined with its indicators.
+    """
+    # Recent bars, formatted straight from the column arrays
+    recent = data.iloc[-10:]
+    timestamps = recent.index.strftime('%Y-%m-%d %H:%M:%S')
+    price_summary = f"Recent {symbol} prices:\n" + "".join(
+        f"- {ts}: Open {o:.2f}, High {h:.2f}, Low {l:.2f}, Close {c:.2f}, Volume {v}\n"
+        for ts, o, h, l, c, v in zip(
+            timestamps, recent['Open'].tolist(), recent['High'].tolist(), recent['Low'].tolist(),
+            recent['Close'].tolist(), recent['Volume'].tolist()))
+
+    close = data['Close'].to_numpy()
+    current_price = float(close[-1])
+    price_change = ((current_price / close[-2]) - 1) * 100
+    high_val = float(data['High'].max())
+    low_val = float(data['Low'].min())
+    vol_val = int(data['Volume'].sum())
+
+    # Trend, momentum and RSI readings
+    sma9, sma20, sma50 = _last(data, 'SMA_9'), _last(data, 'SMA_20'), _last(data, 'SMA_50')
+    macd, macd_signal, macd_hist = _last(data, 'MACD'), _last(data, 'MACD_Signal'), _last(data, 'MACD_Hist')
+    rsi = _last(data, 'RSI')
+
+    # Current market stats
+    market_stats = (
+        f"Current Price: ${current_price:.2f}\n"
+        f"24h Change: {price_change:.2f}%\n"
+        f"24h High: ${high_val:.2f}\n"
+        f"24h Low: ${low_val:.2f}\n"
+        f"Volume: {vol_val:,}\n"
+    )
+
+    # Support/Resistance levels (plain floats)
+    supports, resistances = find_support_resistance(data)
+    supports, resistances = supports[:3], resistances[:3]
+    support_resistance_info = "Key Support Levels: " + ", ".join([f"${s:.2f}" for s in supports]) + "\n"
+    support_resistance_info += "Key Resistance Levels: " + ", ".join([f"${r:.2f}" for r in resistances])
+
+    # Fair Value Gaps price has not traded through yet, closest to the price first
+    fvgs = fair_value_gap_records(OpenGapIndex(unfilled_fair_value_gaps(data)).nearest(current_price, 3))
+    fvg_info = "Unfilled Fair Value Gaps Nearest the Price:\n"
+    for fvg in fvgs:
+        status = "partially filled" if fvg['status'] == 'partial' else "open"
+        fvg_info += (f"- {fvg['type'].title()} FVG at ${fvg['mid']:.2f} "
+                     f"(range: ${fvg['bottom']:.2f}-${fvg['top']:.2f}, {status})\n")
+    if not fvgs:
+        fvg_info += "No unfilled fair value gaps detected.\n"
+
+    return {
+        'price_summary': price_summary,
+        'market_stats': market_stats,
+        'support_resistance_info': support_resistance_info,
+        'fvg_info': fvg_info,
+        'current_price': current_price,
+        'price_change': price_change,
+        'high_val': high_val,
+        'low_val': low_val,
+        'sma9': sma9,
+        'sma20': sma20,
+        'sma50': sma50,
+        'macd': macd,
+        'macd_signal': macd_signal,
+        'macd_hist': macd_hist,
+        'rsi': rsi,
+        'supports': supports,
+        'resistances': resistances,
+    }
+
+
+def build_chat_request(symbol, timeframe, analysis_types, context):
+    """Return the chat completion request (model, messages, limits) for the analysis"""
+    market_stats = context['market_stats']
+    support_resistance_info = context['support_resistance_info']
+    fvg_info = context['fvg_info']
+    price_summary = context['price_summary']
+
+    # Create the full analysis request prompt
+    analysis_request = f"""
+    As a professional market analyst, provide insights on {symbol} at {timeframe} timeframe.
+    
+    {market_stats}
+    
+    {support_resistance_info}
+    
+    {fvg_info}
+    
+    {price_summary}
+    
+    For each selected analysis type, provide:
+    """
+    
+    # Add specific instructions for each analysis type
+    if "Trend Analysis" in analysis_types:
+        analysis_request += """
+        - Trend Analysis: Current trend direction (bullish, bearish, or neutral), trend strength, key trend features, and potential trend continuation or reversal signals. Identify if we're in a larger trend or consolidation. Mention any chart patterns.
+        """
+    
+    if "Support/Resistance" in analysis_types:
+        analysis_request += """
+        - Support/Resistance: Identify key price levels where the asset has historically found support or resistance. Analyze the strength of these levels and their significance in the current market context. Focus on the most important levels and their likelihood of holding or breaking.
+        """
+    
+    if "Fair Value Gaps" in analysis_types:
+        analysis_request += """
+        - Fair Value Gaps: Identify unfilled price gaps (fair value gaps or imbalances) and explain their significance for the current market structure. Discuss how they might act as magnets for price and their potential as targets.
+        """
+    
+    if "Price Action" in analysis_types:
+        analysis_request += """
+        - Price Action: Examine recent candlestick patterns and price behavior. Identify signs of accumulation, distribution, or indecision. Look for candlestick formations that suggest market psychology.
+        """
+    
+    if "Market Sentiment" in analysis_types:
+        analysis_request += """
+        - Market Sentiment: Assess the overall market sentiment and institutional positioning. Describe potential institutional intent based on price action and volume. Consider possible manipulation patterns.
+        """
+        
+    if "Entry/Exit Points" in analysis_types:
+        analysis_request += """
+        - Entry/Exit Points: Identify specific price levels that could serve as optimal entry and exit points based on current market structure.
+          For each entry point, specify:
+            - The type of entry (e.g., breakout, pullback to support, FVG fill).
+            - Key confirmation signals to watch for (e.g., candlestick pattern, volume spike, indicator crossover).
+            - Conditions that would invalidate this entry setup.
+          Include clear, recommended stop-loss levels (with rationale, e.g., below recent swing low, ATR-based) and at least two profit targets with risk-reward ratios.
+        """
+        
+    if "Volume Analysis" in analysis_types:
+        analysis_request += """
+        - Volume Analysis: Examine recent volume patterns and their relationship to price movements. Look for volume spikes, volume divergences, and cumulative volume patterns that might indicate a potential trend reversal or continuation.
+        """
+        
+    if "Liquidity Zones" in analysis_types:
+        analysis_request += """
+        - Liquidity Zones: Identify areas where large stop losses or pending orders may be clustered. These areas may be targets for price moves as the market hunts for liquidity. Explain how these zones might influence future price action.
+        """
+    
+    analysis_request += """
+    
+    Finally, provide a clear, actionable trading recommendation with these elements:
+    1. Overall Market Bias: Bullish, Bearish, or Neutral, with a confidence level (Low, Medium, High).
+    2. Primary Trade Setup:
+        - Suggested Entry Point(s): Specific price level(s) or zone.
+        - Entry Rationale: Detailed explanation linking to the analysis (e.g., "Entry on pullback to confirmed support at $X, coinciding with bullish divergence on RSI").
+        - Confirmation Signals: What specific chart events or indicator readings would confirm the entry?
+        - Stop Loss: Recommended price level and why (e.g., "SL at $Y, just below the 50-period SMA and recent swing low").
+        - Take Profit Targets: At least 2 price targets (e.g., TP1 at $Z1 targeting nearest resistance, TP2 at $Z2 for further extension).
+        - Risk-Reward Ratio: For each target.
+    2. Alternative Scenarios: Briefly mention any secondary setups or what might invalidate the primary view.
+    3. Timeframe: Expected duration for the primary setup to play out (e.g., intraday, 1-3 days, 1 week).
+    
+    Format your analysis for maximum readability with clear sections, bold text for key terms, and bullet points where appropriate. Be precise and avoid vague statements.
+    """
+
+    return dict(
+        model="gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. Do not change this unless explicitly requested by the user
+        messages=[
+            {"role": "system", "content": "You are an expert financial market analyst specializing in technical analysis and trading strategies. Your insights are precise, actionable, and based on sound technical principles. Provide chart analysis like a professional trader would."},
+            {"role": "user", "content": analysis_request}
+        ],
+        max_tokens=1500,
+        temperature=0.3,
+    )
+
+
+def local_analysis(symbol, timeframe, context):
+    """Indicator-only analysis used when the API is unavailable"""
+    current_price, price_change = context['current_price'], context['price_change']
+    high_val, low_val = context['high_val'], context['low_val']
+    sma9, sma20, sma50 = context['sma9'], context['sma20'], context['sma50']
+    macd, macd_signal, macd_hist = context['macd'], context['macd_signal'], context['macd_hist']
+    rsi = context['rsi']
+    scalar_supports, scalar_resistances = context['supports'], context['resistances']
+
+    analysis = f"""
+    ## Technical Analysis for {symbol} - {timeframe}
+    
+    ### Market Overview
+    
+    **Current Price:** ${current_price:.2f}
+    **24h Change:** {price_change:.2f}%
+    **24h High:** ${high_val:.2f}
+    **24h Low:** ${low_val:.2f}
+    
+    ### Technical Indicators
+    """
+    
+    # Add technical indicator analysis based on calculated values
+    if sma9 is not None and sma20 is not None and sma50 is not None:
+        analysis += f"""
+        **Moving Averages:**
+        - SMA 9: ${sma9:.2f}
+        - SMA 20: ${sma20:.2f}
+        - SMA 50: ${sma50:.2f}
+        
+        **Trend Analysis:**
+        """
+        
+        if sma9 > sma20 and sma20 > sma50:
+            analysis += "- Strong Uptrend - All moving averages aligned bullishly (SMA9 > SMA20 > SMA50)"
+        elif sma9 < sma20 and sma20 < sma50:
+            analysis += "- Strong Downtrend - All moving averages aligned bearishly (SMA9 < SMA20 < SMA50)"
+        elif sma9 > sma20 and sma20 < sma50:
+            analysis += "- Potential reversal - Short-term moving averages turning bullish"
+        elif sma9 < sma20 and sma20 > sma50:
+            analysis += "- Potential reversal - Short-term moving averages turning bearish"
+        else:
+            analysis += "- Consolidation/Sideways - No clear trend direction from moving averages"
+    
+    if macd is not None and macd_signal is not None:
+        analysis += f"""
+        
+        **MACD Analysis:**
+        - MACD Line: {macd:.4f}
+        - Signal Line: {macd_signal:.4f}
+        - Histogram: {macd_hist:.4f}
+        
+        **Momentum:**
+        """
+        
+        if macd > macd_signal and macd_hist > 0:
+            analysis += "- Bullish momentum is increasing"
+        elif macd > macd_signal and macd_hist < 0:
+            analysis += "- Bullish momentum is emerging"
+        elif macd < macd_signal and macd_hist < 0:
+            analysis += "- Bearish momentum is increasing"
+        elif macd < macd_signal and macd_hist > 0:
+            analysis += "- Bearish momentum is emerging"
+    
+    if rsi is not None:
+        analysis += f"""
+        
+        **RSI Analysis:**
+        - Current RSI: {rsi:.2f}
+        
+        **Overbought/Oversold:**
+        """
+        
+        if rsi > 70:
+            analysis += "- Overbought conditions: Potential for a pullback or correction"
+        elif rsi < 30:
+            analysis += "- Oversold conditions: Potential for a bounce or recovery"
+        else:
+            analysis += f"- RSI in neutral territory ({rsi:.2f})"
+    
+    # Add support/resistance levels
+    analysis += """
+    
+    ### Key Price Levels
+    
+    **Support Levels:**
+    """
+    
+    for s in scalar_supports[:3]:
+        distance = ((s / current_price) - 1) * 100
+        analysis += f"- ${s:.2f} ({distance:.2f}% from current price)\n"
+    
+    analysis += """
+    
+    **Resistance Levels:**
+    """
+    
+    for r in scalar_resistances[:3]:
+        distance = ((r / current_price) - 1) * 100
+        analysis += f"- ${r:.2f} ({distance:.2f}% from current price)\n"
+    
+    # Add trade recommendation based on technical indicators
+    analysis += """
+    
+    ### Trade Recommendation
+    """
+    
+    # Determine market direction
+    direction = "Neutral"
+    confidence = "Low"
+    
+    if sma9 is not None and sma20 is not None:
+        if sma9 > sma20 and (macd is not None and macd > macd_signal) and (rsi is not None and rsi > 50 and rsi < 70):
+            direction = "Bullish"
+            confidence = "Medium"
+            if sma20 > sma50:
+                confidence = "High"
+        elif sma9 < sma20 and (macd is not None and macd < macd_signal) and (rsi is not None and rsi < 50 and rsi > 30):
+            direction = "Bearish"
+            confidence = "Medium"
+            if sma20 < sma50:
+                confidence = "High"
+    
+    analysis += f"""
+    **Market Direction:** {direction} (Confidence: {confidence})
+    
+    **Entry Strategy:**
+    """
+    
+    if direction == "Bullish":
+        # Calculate suitable entry, stop loss and targets
+        entry = current_price * 0.99  # Slight discount to current price
+        stop_loss = min(scalar_supports[0] if scalar_supports else current_price * 0.95, current_price * 0.95)
+        tp1 = current_price * 1.05
+        tp2 = current_price * 1.10
+        
+        analysis += f"""
+        - **Entry Point:** ${entry:.2f} (slight pullback from current price)
+        - **Stop Loss:** ${stop_loss:.2f} (below key support)
+        - **Take Profit 1:** ${tp1:.2f} (Risk-to-Reward: 1:{((tp1-entry)/(entry-stop_loss)):.1f})
+        - **Take Profit 2:** ${tp2:.2f} (Risk-to-Reward: 1:{((tp2-entry)/(entry-stop_loss)):.1f})
+        - **Timeframe:** Short to medium-term (1-2 weeks)
+        """
+    elif direction == "Bearish":
+        # Calculate suitable entry, stop loss and targets
+        entry = current_price * 1.01  # Slight premium to current price on bounce
+        stop_loss = max(scalar_resistances[0] if scalar_resistances else current_price * 1.05, current_price * 1.05)
+        tp1 = current_price * 0.95
+        tp2 = current_price * 0.90
+        
+        analysis += f"""
+        - **Entry Point:** ${entry:.2f} (on small bounce)
+        - **Stop Loss:** ${stop_loss:.2f} (above key resistance)
+        - **Take Profit 1:** ${tp1:.2f} (Risk-to-Reward: 1:{((entry-tp1)/(stop_loss-entry)):.1f})
+        - **Take Profit 2:** ${tp2:.2f} (Risk-to-Reward: 1:{((entry-tp2)/(stop_loss-entry)):.1f})
+        - **Timeframe:** Short to medium-term (1-2 weeks)
+        """
+    else:
+        analysis += """
+        - Wait for clearer market direction before entering any trades
+        - Focus on identifying key breakout or breakdown levels
+        - Consider range-bound strategies between identified support and resistance
+        """
+    
+    analysis += """
+    
+    ### Risk Warning
+    
+    This analysis is based on technical indicators only and should not be considered financial advice. 
+    Always manage your risk appropriately and never invest more than you can afford to lose.
+    """
+
+    return analysis
@@ -0,0 +1,229 @@
+"""Market data providers behind one download interface.
+
+Every provider has ``download(ticker, interval, period=None, start=None)``
+with the semantics :class:`market_store.MarketDataStore` expects: ``ticker``
+is a symbol or a list of symbols, and either ``period`` (a yfinance-style
+string) or ``start`` (a timestamp) bounds the history.  All of them return
+the same schema: (Price, Ticker) MultiIndex columns over canonical frames
+(see :func:`market_store.normalize_ohlcv`), i.e. Open, High, Low, Close
+(float64) and Volume (int64) on a UTC DatetimeIndex named ``Datetime``.
+
+* ``yfinance`` - live data from Yahoo Finance.
+* ``replay`` - recorded bars from ``<dir>/<SYMBOL>_<interval>.parquet`` (or
+  ``.csv``), optionally shifted so the last bar lands on the current time.
+* ``synthetic`` - seeded random walks; a given bar has the same values no
+  matter which window requested it, so delta refreshes merge cleanly.
+
+``get_provider()`` picks one from ``MARKET_DATA_PROVIDER`` and friends.
+"""
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from market_store import OHLCV_COLUMNS, normalize_ohlcv, period_start, split_tickers
+from resample import HISTORY_LIMIT_DAYS, INTERVAL_MINUTES
+
+
+def conform(frames):
+    """Combine ``{symbol: flat OHLCV frame}`` into the shared provider schema"""
+    parts = {symbol: normalize_ohlcv(frame) for symbol, frame in frames.items()
+             if frame is not None and not frame.empty}
+    if not parts:
+        return pd.DataFrame(columns=pd.MultiIndex.from_product(
+            [OHLCV_COLUMNS, []], names=["Price", "Ticker"]))
+    data = pd.concat(parts, axis=1, names=["Ticker", "Price"])
+    return data.swaplevel(axis=1).loc[:, pd.MultiIndex.from_product(
+        [OHLCV_COLUMNS, list(parts)], names=["Price", "Ticker"])]
+
+
+def _symbols(ticker):
+    return [ticker] if isinstance(ticker, str) else list(ticker)
+
+
+class MarketDataProvider:
+    """Base class: subclasses return one symbol's flat frame from ``history``"""
+
+    name = None
+
+    def history(self, symbol, interval, start, end):
+        """Bars for ``symbol`` from ``start`` (None = as far back as available) to ``end``"""
+        raise NotImplementedError
+
+    def download(self, ticker, interval, period=None, start=None):
+        end = pd.Timestamp.now(tz="UTC")
+        if start is None:
+            start = period_start(period, end)
+        else:
+            start = pd.Timestamp(start)
+            start = start.tz_localize("UTC") if start.tz is None else start.tz_convert("UTC")
+        return conform({s: self.history(s, interval, start, end) for s in _symbols(ticker)})
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Yahoo Finance via ``yf.download``; several symbols share one request"""
+
+    name = "yfinance"
+
+    def download(self, ticker, interval, period=None, start=None):
+        import yfinance as yf
+
+        if start is not None:
+            data = yf.download(tickers=ticker, interval=interval, start=start)
+        else:
+            data = yf.download(tickers=ticker, interval=interval, period=period)
+        symbols = _symbols(ticker)
+        return conform(split_tickers(data, symbols))
+
+
+class ReplayProvider(MarketDataProvider):
+    """Recorded bars from Parquet or CSV files in a directory.
+
+    Files are named ``<SYMBOL>_<interval>.parquet`` or ``.csv`` (the symbol
+    with anything but letters, digits, ``.`` and ``-`` replaced by ``_``);
+    CSVs need a datetime first column.  With ``shift_to_now`` the whole
+    recording is moved forward, once on first use, so its last bar is the
+    bar current at that time.  The shift then stays fixed, so later delta
+    refreshes see the same bars at the same times and replayed time only
+    moves forward.
+    """
+
+    name = "replay"
+
+    def __init__(self, root, shift_to_now=True):
+        self.root = root
+        self.shift_to_now = shift_to_now
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _load(self, symbol, interval, end):
+        key = (symbol, interval)
+        with self._lock:
+            if key not in self._frames:
+                self._frames[key] = self._read(symbol, interval, end)
+            return self._frames[key]
+
+    def _read(self, symbol, interval, end):
+        """Read a recording, shifted so its last bar is the one current at ``end``"""
+        stem = os.path.join(self.root, f"{re.sub(r'[^A-Za-z0-9.-]', '_', symbol)}_{interval}")
+        if os.path.exists(f"{stem}.parquet"):
+            frame = pd.read_parquet(f"{stem}.parquet")
+        elif os.path.exists(f"{stem}.csv"):
+            frame = pd.read_csv(f"{stem}.csv", index_col=0)
+            frame.index = pd.to_datetime(frame.index, utc=True)
+        else:
+            return None
+        frame = normalize_ohlcv(frame)
+        if self.shift_to_now and not frame.empty:
+            step = pd.Timedelta(minutes=INTERVAL_MINUTES.get(interval, 1))
+            frame = frame.set_axis(frame.index + (end.floor(step) - frame.index[-1]))
+        return frame
+
+    def history(self, symbol, interval, start, end):
+        frame = self._load(symbol, interval, end)
+        if frame is None or frame.empty:
+            return None
+        if start is not None:
+            frame = frame[frame.index >= start]
+        return frame[frame.index <= end]
+
+
+class SyntheticProvider(MarketDataProvider):
+    """Seeded random-walk bars for any symbol, around the clock.
+
+    Day-start price levels follow a daily random walk from 2000-01-01; the
+    bars inside each day form a Brownian bridge between consecutive levels,
+    drawn from a generator keyed on (seed, symbol, interval, day).  Each bar
+    therefore depends only on its own day, never on the requested window.
+    """
+
+    name = "synthetic"
+    EPOCH = pd.Timestamp("2000-01-01", tz="UTC")
+
+    def __init__(self, seed=0, daily_volatility=0.03, start_price=100.0):
+        self.seed = seed
+        self.daily_volatility = daily_volatility
+        self.start_price = start_price
+
+    def _key(self, symbol):
+        return [self.seed, zlib.crc32(symbol.encode("utf-8"))]
+
+    def _day_levels(self, symbol, last_day):
+        rng = np.random.default_rng(self._key(symbol))
+        steps = rng.normal(0, self.daily_volatility, last_day + 2)
+        return np.log(self.start_price) + np.r_[0.0, np.cumsum(steps[:-1])]
+
+    def history(self, symbol, interval, start, end):
+        minutes = INTERVAL_MINUTES[interval]
+        step = pd.Timedelta(minutes=minutes)
+        limit = HISTORY_LIMIT_DAYS.get(interval)
+        earliest = self.EPOCH if limit is None else end - pd.Timedelta(days=limit)
+        start = earliest if start is None else max(start, earliest)
+        index = pd.date_range(start.ceil(step), end.floor(step), freq=step, name="Datetime")
+        if not len(index):
+            return None
+
+        day = np.asarray((index - self.EPOCH) // pd.Timedelta(days=1), dtype=np.int64)
+        levels = self._day_levels(symbol, int(day[-1]))
+        per_day = max(1440 // minutes, 1)
+        bar_volatility = self.daily_volatility / np.sqrt(per_day)
+        log_close = np.empty(len(index))
+        log_open = np.empty(len(index))
+        wick = np.empty((2, len(index)))
+        volume = np.empty(len(index), dtype=np.int64)
+        for d in np.unique(day):
+            rows = np.flatnonzero(day == d)
+            rng = np.random.default_rng(self._key(symbol) + [minutes, int(d)])
+            # Bridge from this day's level to the next day's over ``per_day`` bars
+            walk = np.cumsum(rng.normal(0, bar_volatility, per_day))
+            frac = np.arange(1, per_day + 1) / per_day
+            path = levels[d] + walk - frac * walk[-1] + frac * (levels[d + 1] - levels[d])
+            day_wick = np.abs(rng.normal(0, bar_volatility / 2, (2, per_day)))
+            day_volume = rng.lognormal(8, 1, per_day).astype(np.int64)
+
+            slot = np.asarray((index[rows] - (self.EPOCH + pd.Timedelta(days=int(d)))) // step,
+                              dtype=np.int64)
+            log_close[rows] = path[slot]
+            log_open[rows] = np.r_[levels[d], path][slot]
+            wick[:, rows] = day_wick[:, slot]
+            volume[rows] = day_volume[slot]
+
+        close, open_ = np.exp(log_close), np.exp(log_open)
+        return pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + wick[0]),
+            "Low": np.minimum(open_, close) * (1 - wick[1]),
+            "Close": close,
+            "Volume": volume,
+        }, index=index)
+
+
+PROVIDERS = {
+    "yfinance": YFinanceProvider,
+    "replay": ReplayProvider,
+    "synthetic": SyntheticProvider,
+}
+
+
+def get_provider(name=None):
+    """Build the provider named ``name`` (default: ``MARKET_DATA_PROVIDER`` or yfinance).
+
+    ``REPLAY_DIR`` sets the replay directory (default ``replay_data``) and
+    ``SYNTHETIC_SEED`` the synthetic seed.
+    """
+    name = name or os.environ.get("MARKET_DATA_PROVIDER", "yfinance")
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown market data provider: {name} (choose from {', '.join(PROVIDERS)})")
+    if name == "replay":
+        return ReplayProvider(os.environ.get("REPLAY_DIR", "replay_data"))
+    if name == "synthetic":
+        return SyntheticProvider(seed=int(os.environ.get("SYNTHETIC_SEED", 0)))
+    return YFinanceProvider()
+
+
+def store_root(root, provider):
+    """Bar store directory for ``provider``, so sources never mix in one store"""
+    return root if provider.name == "yfinance" else os.path.join(root, provider.name)
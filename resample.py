@@ -0,0 +1,101 @@
+"""Derive higher timeframes locally from finer bars.
+
+Switching the timeframe selectbox should not cost a download when the bars
+are already on hand: 5m, 15m and 1h bars are built from 1m (or 5m/15m) data
+and daily bars from hourly data, as long as the finer interval's history
+limit on yfinance still covers the requested period.
+"""
+import pandas as pd
+
+from market_store import period_start
+
+INTERVAL_MINUTES = {"1m": 1, "5m": 5, "15m": 15, "60m": 60, "1d": 1440}
+
+# How far back yfinance serves each interval, in days (None = unlimited)
+HISTORY_LIMIT_DAYS = {"1m": 7, "5m": 60, "15m": 60, "60m": 730, "1d": None}
+
+# Finer intervals each timeframe may be built from, finest first
+DERIVABLE_FROM = {
+    "5m": ["1m"],
+    "15m": ["1m", "5m"],
+    "60m": ["1m", "5m", "15m"],
+    "1d": ["60m"],
+}
+
+# Shortest gap in intraday bars that counts as the break before a session open
+SESSION_BREAK = pd.Timedelta(hours=3)
+
+OHLCV_AGGREGATION = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Volume": "sum",
+}
+
+
+def source_interval(interval, period):
+    """Return the interval to download for ``interval`` over ``period``.
+
+    That is the finest interval ``interval`` can be built from whose
+    history limit covers the period, or ``interval`` itself.
+    """
+    start = period_start(period)
+    if start is None:
+        return interval
+    days = (pd.Timestamp.now(tz="UTC") - start).days
+    for base in DERIVABLE_FROM.get(interval, []):
+        limit = HISTORY_LIMIT_DAYS[base]
+        if limit is None or days <= limit:
+            return base
+    return interval
+
+
+def session_offset(index, minutes):
+    """Offset that aligns ``minutes``-wide bins to the session open.
+
+    Session opens are the bars that follow an overnight break of at least
+    ``SESSION_BREAK``.  Shorter holes (missing minutes in around-the-clock
+    crypto data) are not opens, and when there are no opens or they do not
+    mostly agree on a time of day the bins stay clock-aligned.
+    """
+    if len(index) < 2:
+        return pd.Timedelta(0)
+    opens = index[1:][(index[1:] - index[:-1]) >= SESSION_BREAK]
+    if not len(opens):
+        return pd.Timedelta(0)
+    counts = pd.Series(opens.hour * 60 + opens.minute).value_counts()
+    if counts.iloc[0] * 2 <= len(opens):
+        return pd.Timedelta(0)
+    return pd.Timedelta(minutes=int(counts.index[0]) % minutes)
+
+
+def bin_grid(index, interval):
+    """``(bin_start, step)``: one bin start and the width of the bins :func:`resample_ohlcv` uses"""
+    minutes = INTERVAL_MINUTES[interval]
+    bin_start = index[-1].floor("D")
+    if interval != "1d":
+        # Days hold a whole number of bins, so any midnight plus the offset is on the grid
+        bin_start += session_offset(index, minutes)
+    return bin_start, pd.Timedelta(minutes=minutes)
+
+
+def resample_ohlcv(df, interval):
+    """Aggregate a finer OHLCV frame into ``interval`` bars.
+
+    ``df`` is a canonical frame (see :func:`market_store.normalize_ohlcv`),
+    so the result is one too.  Intraday bins are aligned to the session
+    open; daily bins follow the UTC calendar day.  Bins without any bar
+    (nights, weekends) are dropped.
+    """
+    if df is None or df.empty:
+        return df
+    minutes = INTERVAL_MINUTES[interval]
+    if interval == "1d":
+        out = df.resample("1D", label="left", closed="left").agg(OHLCV_AGGREGATION)
+    else:
+        out = df.resample(f"{minutes}min", label="left", closed="left",
+                          origin="start_day", offset=session_offset(df.index, minutes)).agg(OHLCV_AGGREGATION)
+    out = out.dropna(subset=["Open"])
+    out.index.name = df.index.name
+    return out
@@ -0,0 +1,443 @@
+"""Push-based live bars from a pluggable tick feed.
+
+A feed delivers trades ``(time in ns, price, size)`` per symbol from its own
+thread.  :class:`BarStream` folds them into the open bar of one interval,
+keeps the candles of the display timeframe, their indicators and the live
+metrics in step, all in constant time per trade and memory bounded by the
+stats window.  When a feed reconnects its streams are reseeded from a fresh
+load.  The time from a trade leaving the feed to the updated metrics is
+recorded for every trade.
+
+* ``replay`` - trades recorded in ``<REPLAY_DIR>/<SYMBOL>_ticks.parquet`` (or
+  ``.csv``) with ``time``, ``price`` and ``size`` columns, replayed at the
+  recorded pace (times ``speed``; 0 = as fast as possible), shifted to start
+  now.
+* ``synthetic`` - seeded random trades at a fixed rate, starting from each
+  subscriber's last price.
+
+``get_feed()`` picks one from ``MARKET_DATA_FEED``.  A websocket client
+plugs in the same way: subclass :class:`TickFeed`, and call ``publish`` for
+every trade from ``run``.
+"""
+import os
+import re
+import threading
+import time
+import zlib
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from indicators import INDICATOR_COLUMNS, IndicatorEngine, extend_indicators
+from live import LiveBars
+from resample import INTERVAL_MINUTES, bin_grid, resample_ohlcv
+
+# Tick-to-metrics latency budget, in milliseconds
+LATENCY_TARGET_MS = 5.0
+
+
+def latency_summary(latencies, target_ms=LATENCY_TARGET_MS):
+    """Percentiles in milliseconds of latencies in seconds, against ``target_ms``"""
+    samples = np.asarray(latencies, dtype=np.float64) * 1e3
+    if not len(samples):
+        return {'count': 0, 'target_ms': target_ms}
+    return {
+        'count': len(samples),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'max_ms': float(samples.max()),
+        'target_ms': target_ms,
+        'over_target': int((samples > target_ms).sum()),
+    }
+
+
+class TickFeed:
+    """Base class: ``run`` publishes trades until :meth:`stop` is called.
+
+    ``run`` calls :meth:`connected` each time it (re)connects to its source;
+    from the second time on subscribers are told to reload, since trades may
+    have been missed in between.
+    """
+
+    name = None
+
+    def __init__(self):
+        self._subscribers = {}
+        self._resets = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._connections = 0
+        self.reset_errors = 0
+
+    def subscribe(self, symbol, callback, last_price=None, on_reset=None):
+        """Call ``callback(time_ns, price, size, published)`` for each trade in ``symbol``.
+
+        ``published`` is the ``perf_counter`` reading when the trade left the
+        feed.  ``last_price`` is a hint for feeds that make prices up.
+        ``on_reset()`` is called from the feed thread after a reconnect.
+        """
+        with self._lock:
+            self._subscribers.setdefault(symbol, []).append(callback)
+            if on_reset is not None:
+                self._resets[callback] = on_reset
+
+    def unsubscribe(self, symbol, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(symbol, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            self._resets.pop(callback, None)
+
+    def connected(self):
+        """Record a (re)connection, resetting subscribers on every one after the first"""
+        with self._lock:
+            self._connections += 1
+            resets = list(self._resets.values()) if self._connections > 1 else []
+        for on_reset in resets:
+            try:
+                on_reset()
+            except Exception:
+                # A failed reload leaves that subscriber on its old state
+                self.reset_errors += 1
+
+    def symbols(self):
+        with self._lock:
+            return [symbol for symbol, callbacks in self._subscribers.items() if callbacks]
+
+    def publish(self, symbol, time_ns, price, size):
+        """Deliver one trade to the symbol's subscribers"""
+        with self._lock:
+            callbacks = list(self._subscribers.get(symbol, ()))
+        published = time.perf_counter()
+        for callback in callbacks:
+            callback(time_ns, price, size, published)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name=f"tick-feed-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def join(self, timeout=None):
+        """Wait for a finite feed (e.g. a replay without ``loop``) to run out"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self):
+        raise NotImplementedError
+
+
+class FileReplayFeed(TickFeed):
+    """Recorded trades from Parquet or CSV files, one file per symbol.
+
+    Files are named ``<SYMBOL>_ticks.parquet`` or ``.csv`` (the symbol with
+    anything but letters, digits, ``.`` and ``-`` replaced by ``_``) and hold
+    ``time``, ``price`` and ``size`` columns.  Every symbol subscribed when
+    the replay starts is replayed, merged in time order.
+    """
+
+    name = "replay"
+
+    def __init__(self, root, speed=1.0, shift_to_now=True, loop=False):
+        super().__init__()
+        self.root = root
+        self.speed = speed
+        self.shift_to_now = shift_to_now
+        self.loop = loop
+
+    def load(self, symbol):
+        """Return ``(time_ns, price, size)`` arrays for a symbol's recording"""
+        stem = os.path.join(self.root, f"{re.sub(r'[^A-Za-z0-9.-]', '_', symbol)}_ticks")
+        if os.path.exists(f"{stem}.parquet"):
+            frame = pd.read_parquet(f"{stem}.parquet")
+        elif os.path.exists(f"{stem}.csv"):
+            frame = pd.read_csv(f"{stem}.csv")
+        else:
+            return None
+        stamps = pd.DatetimeIndex(pd.to_datetime(frame["time"], utc=True)).as_unit("ns").asi8
+        order = np.argsort(stamps, kind="stable")
+        return (stamps[order], frame["price"].to_numpy(dtype=np.float64)[order],
+                frame["size"].to_numpy(dtype=np.float64)[order])
+
+    def run(self):
+        while not self._stop.is_set():
+            recordings = {s: r for s in self.symbols() if (r := self.load(s)) is not None}
+            if not recordings:
+                if self._stop.wait(0.1):
+                    return
+                continue
+            symbols = np.concatenate([np.full(len(r[0]), i) for i, r in enumerate(recordings.values())])
+            stamps, prices, sizes = (np.concatenate(parts) for parts in zip(*recordings.values()))
+            order = np.argsort(stamps, kind="stable")
+            names = list(recordings)
+
+            self.connected()
+            first = stamps[order[0]]
+            shift = pd.Timestamp.now(tz="UTC").value - first if self.shift_to_now else 0
+            started = time.perf_counter()
+            for i in order.tolist():
+                if self._stop.is_set():
+                    return
+                if self.speed:
+                    delay = (stamps[i] - first) / 1e9 / self.speed - (time.perf_counter() - started)
+                    if delay > 0 and self._stop.wait(delay):
+                        return
+                self.publish(names[symbols[i]], int(stamps[i] + shift), float(prices[i]), float(sizes[i]))
+            if not self.loop:
+                return
+
+
+class SyntheticTickFeed(TickFeed):
+    """Seeded random-walk trades for every subscribed symbol at ``rate`` per second"""
+
+    name = "synthetic"
+
+    def __init__(self, seed=0, rate=20.0, volatility=0.0002, start_price=100.0):
+        super().__init__()
+        self.seed = seed
+        self.rate = rate
+        self.volatility = volatility
+        self.start_price = start_price
+        self._prices = {}
+
+    def subscribe(self, symbol, callback, last_price=None, on_reset=None):
+        with self._lock:
+            if last_price is not None or symbol not in self._prices:
+                self._prices[symbol] = float(last_price or self.start_price)
+        super().subscribe(symbol, callback, last_price, on_reset)
+
+    def run(self):
+        self.connected()
+        rng = np.random.default_rng([self.seed, zlib.crc32(self.name.encode("utf-8"))])
+        while not self._stop.wait(1.0 / self.rate):
+            for symbol in self.symbols():
+                with self._lock:
+                    price = self._prices[symbol] * float(np.exp(rng.normal(0, self.volatility)))
+                    self._prices[symbol] = price
+                self.publish(symbol, time.time_ns(), price, float(rng.lognormal(2, 1)))
+
+
+FEEDS = {
+    "replay": FileReplayFeed,
+    "synthetic": SyntheticTickFeed,
+}
+
+
+def get_feed(name=None):
+    """Build the feed named ``name`` (default: ``MARKET_DATA_FEED``); None if unset.
+
+    ``REPLAY_DIR`` sets the replay directory (default ``replay_data``) and
+    ``REPLAY_SPEED`` its pace; ``SYNTHETIC_SEED`` seeds the synthetic feed.
+    """
+    name = name or os.environ.get("MARKET_DATA_FEED")
+    if not name:
+        return None
+    if name not in FEEDS:
+        raise ValueError(f"Unknown tick feed: {name} (choose from {', '.join(FEEDS)})")
+    if name == "replay":
+        return FileReplayFeed(os.environ.get("REPLAY_DIR", "replay_data"),
+                              speed=float(os.environ.get("REPLAY_SPEED", 1.0)), loop=True)
+    return SyntheticTickFeed(seed=int(os.environ.get("SYNTHETIC_SEED", 0)))
+
+
+class BarStream:
+    """Live bars, indicators and metrics for one symbol, fed by trades.
+
+    Seeded from a canonical cached frame of ``interval`` bars whose last bar
+    is the open one; trades are folded into bars on that frame's grid, and
+    trades older than the open bar are counted as late and dropped.
+    ``display`` is the chart's timeframe (default ``interval``): the metrics
+    and indicators follow its candles, with ``window`` as in
+    :class:`live.LiveBars`.  Only the bars the stats can reach are held, so
+    memory stays bounded; :meth:`frame` lays them over the latest cached
+    frame.  Every trade is recorded as a ``tick_to_metrics`` span on
+    ``metrics`` if given.
+    """
+
+    def __init__(self, frame, interval, display=None, window=None, metrics=None,
+                 max_latencies=10_000):
+        self.interval = interval
+        self.display = display or interval
+        self.window = window
+        self.metrics = metrics
+        self._step = INTERVAL_MINUTES[interval] * 60 * 10**9
+        # Bars per display candle times the candles the stats cover
+        self.max_bars = INTERVAL_MINUTES[self.display] // INTERVAL_MINUTES[interval] * (window or 1)
+        self.ticks = 0
+        self.late_ticks = 0
+        self.reseeds = 0
+        self.version = 0
+        self.latencies = deque(maxlen=max_latencies)
+        self._lock = threading.Lock()
+        self._frame = None
+        self._seed(frame)
+
+    def _seed(self, frame):
+        self._seed_frame = frame
+        self._dtypes = frame.dtypes.to_dict()
+        last = frame.iloc[-1]
+        self._open_ns = frame.index[-1].value
+        self._open = [frame.index[-1], float(last['Open']), float(last['High']), float(last['Low']),
+                      float(last['Close']), int(last['Volume'])]
+        self._closed = deque(maxlen=self.max_bars)
+
+        if self.display == self.interval:
+            candles, bin_start, step = frame, None, None
+        else:
+            candles = resample_ohlcv(frame, self.display)
+            bin_start, step = bin_grid(frame.index, self.display)
+        self.live = LiveBars(frame, window=self.window, bin_start=bin_start, step=step)
+        self._stats = self.live.stats()
+        # Engine state from before the open display candle, advanced once per settled candle
+        _, cached = extend_indicators(candles['Close'])
+        self._engine = IndicatorEngine.from_state(cached['state'])
+        self._committed = self.live.settled
+
+    def reseed(self, frame):
+        """Start over from a freshly loaded frame (e.g. after the feed reconnected)"""
+        if frame is None or frame.empty:
+            return
+        with self._lock:
+            self._seed(frame)
+            self.reseeds += 1
+            self.version += 1
+            self._frame = None
+
+    def on_tick(self, time_ns, price, size, published=None):
+        """Fold one trade into the open bar and refresh the metrics"""
+        with self._lock:
+            if time_ns < self._open_ns:
+                self.late_ticks += 1
+                return
+            if time_ns >= self._open_ns + self._step:
+                # The open bar is complete
+                self._closed.append(tuple(self._open))
+                self._open_ns += (time_ns - self._open_ns) // self._step * self._step
+                self._open = [pd.Timestamp(self._open_ns, tz="UTC"), price, price, price, price, 0]
+            bar = self._open
+            bar[2] = max(bar[2], price)
+            bar[3] = min(bar[3], price)
+            bar[4] = price
+            bar[5] += int(size)
+            self.live.push_bar(*bar)
+            if self.live.settled != self._committed:
+                # A display candle just closed: it joins the indicator state
+                self._engine.update(self.live.candles[-1][4])
+                self._committed = self.live.settled
+            self._stats = self.live.stats()
+            self.ticks += 1
+            self.version += 1
+            if published is not None:
+                self.latencies.append(time.perf_counter() - published)
+        if published is not None and self.metrics is not None:
+            self.metrics.observe("tick_to_metrics", self.latencies[-1])
+
+    def stats(self):
+        """The live metrics as of the last trade (see :meth:`live.LiveBars.stats`)"""
+        with self._lock:
+            return dict(self._stats)
+
+    def candle(self):
+        """The open display candle (see :meth:`live.LiveBars.candle`)"""
+        with self._lock:
+            return self.live.candle()
+
+    def indicators(self):
+        """Indicator values of the display timeframe including the open candle, as ``{column: value}``"""
+        with self._lock:
+            engine = IndicatorEngine.from_state(self._engine.to_state())
+            close = self.live.candle()['Close']
+        return dict(zip(INDICATOR_COLUMNS, engine.update(close)))
+
+    def frame(self, base=None):
+        """``base`` (default: the seed frame) with the streamed bars laid over it.
+
+        Streamed bars replace the cached ones they overlap, so the result is
+        the latest cached frame plus whatever trades added since; bars that
+        left the bounded history are expected to be in ``base`` by then.
+        """
+        base = self._seed_frame if base is None else base
+        with self._lock:
+            cached = self._frame
+            if cached is not None and cached[0] is base and cached[1] == self.version:
+                return cached[2]
+            rows = list(self._closed) + [tuple(self._open)]
+            version = self.version
+        index = pd.DatetimeIndex([row[0] for row in rows], name=base.index.name).as_unit(base.index.unit)
+        streamed = pd.DataFrame([row[1:] for row in rows], index=index, columns=list(self._dtypes))
+        head = base.index.searchsorted(index[0])
+        tail = base.index.searchsorted(index[-1], side="right")
+        frame = pd.concat([base.iloc[:head], streamed.astype(base.dtypes.to_dict()), base.iloc[tail:]])
+        with self._lock:
+            self._frame = (base, version, frame)
+        return frame
+
+    def latency_summary(self, target_ms=LATENCY_TARGET_MS):
+        """Tick-to-metrics latency of this stream (see :func:`latency_summary`)"""
+        with self._lock:
+            samples = list(self.latencies)
+        return latency_summary(samples, target_ms)
+
+
+class StreamHub:
+    """One :class:`BarStream` per key, each subscribed to a shared, started feed.
+
+    A stream nobody has asked for in ``idle_timeout`` seconds is
+    unsubscribed and dropped on the next :meth:`get`, so only charts still
+    being watched cost work per trade.
+    """
+
+    def __init__(self, feed, metrics=None, idle_timeout=600):
+        self.feed = feed
+        self.metrics = metrics
+        self.idle_timeout = idle_timeout
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, symbol, interval, frame, display=None, window=None, reload=None):
+        """Return the stream for ``key``, seeding it from ``frame`` on first use.
+
+        ``reload()`` returns a fresh frame (e.g. through the bar store) to
+        reseed the stream from when the feed reconnects.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._release_idle(now)
+            entry = self._streams.get(key)
+            if entry is None:
+                stream = BarStream(frame, interval, display=display, window=window, metrics=self.metrics)
+                on_reset = None if reload is None else (lambda: stream.reseed(reload()))
+                self.feed.subscribe(symbol, stream.on_tick, last_price=float(frame['Close'].iloc[-1]),
+                                    on_reset=on_reset)
+                entry = self._streams[key] = {"stream": stream, "symbol": symbol}
+                self.feed.start()
+            entry["last_access"] = now
+        return entry["stream"]
+
+    def _release_idle(self, now):
+        for key in [k for k, e in self._streams.items() if now - e["last_access"] > self.idle_timeout]:
+            # Nobody is looking at this chart any more; stop feeding it trades
+            entry = self._streams.pop(key)
+            self.feed.unsubscribe(entry["symbol"], entry["stream"].on_tick)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._streams)
+
+    def latency_summary(self, target_ms=LATENCY_TARGET_MS):
+        """Tick-to-metrics latency over every stream"""
+        with self._lock:
+            streams = [entry["stream"] for entry in self._streams.values()]
+        samples = []
+        for stream in streams:
+            with stream._lock:
+                samples.extend(stream.latencies)
+        return latency_summary(samples, target_ms)
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""Lightweight timing spans and counters.
+
+A :class:`Metrics` registry is shared by the script thread and background
+threads.  Recording a span or bumping a counter is a ``perf_counter`` call
+and a dict update under a lock, so the instrumentation stays on in
+production.  Snapshots export as JSON or in the Prometheus text format.
+"""
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Metrics:
+    """Thread-safe registry of timing spans, counters and gauges"""
+
+    def __init__(self, namespace="tradingview"):
+        self.namespace = namespace
+        self.started_at = time.time()
+        self._spans = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        """Time the enclosed block under ``name``"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def observe(self, name, seconds):
+        """Record one duration for span ``name``"""
+        with self._lock:
+            span = self._spans.get(name)
+            if span is None:
+                self._spans[name] = {'count': 1, 'total_s': seconds, 'last_s': seconds,
+                                     'max_s': seconds}
+            else:
+                span['count'] += 1
+                span['total_s'] += seconds
+                span['last_s'] = seconds
+                if seconds > span['max_s']:
+                    span['max_s'] = seconds
+
+    def incr(self, name, amount=1):
+        """Add ``amount`` to counter ``name``"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        """Set gauge ``name`` to its current ``value``"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def snapshot(self):
+        """Return a copy of every span, counter and gauge"""
+        with self._lock:
+            return {
+                'uptime_s': time.time() - self.started_at,
+                'spans': {name: dict(span) for name, span in self._spans.items()},
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        """Render the snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        prefix = self.namespace
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per stage",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for name, span in sorted(snapshot['spans'].items()):
+            label = f'{{stage="{name}"}}'
+            lines.append(f"{prefix}_stage_seconds_sum{label} {span['total_s']:.6f}")
+            lines.append(f"{prefix}_stage_seconds_count{label} {span['count']}")
+        lines.append(f"# TYPE {prefix}_stage_last_seconds gauge")
+        for name, span in sorted(snapshot['spans'].items()):
+            lines.append(f'{prefix}_stage_last_seconds{{stage="{name}"}} {span["last_s"]:.6f}')
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, value in sorted(snapshot['gauges'].items()):
+            metric = f"{prefix}_{_metric_name(name)}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Atomically write the Prometheus text to ``path`` (node_exporter textfile collector)"""
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
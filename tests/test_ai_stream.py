@@ -0,0 +1,53 @@
+from ai_cache import AnalysisCache
+from ai_stream import MockChatClient, stream_chat_completion
+
+CHUNKS = ["## Analysis\n", "Bias: ", "Neutral", "\n- streamed"]
+
+
+def test_chunks_arrive_in_order_and_ttft_is_recorded():
+    client = MockChatClient(CHUNKS, first_token_delay=0.05, chunk_delay=0.001)
+    rendered = []
+
+    text, timings = stream_chat_completion(client, on_text=rendered.append, min_interval=0,
+                                           model="gpt-4o", messages=[])
+
+    assert text == "".join(CHUNKS)
+    # Every render is the text so far, growing one chunk at a time, and the last is complete
+    assert rendered[:len(CHUNKS)] == ["".join(CHUNKS[:i + 1]) for i in range(len(CHUNKS))]
+    assert rendered[-1] == text
+    assert timings["chunks"] == len(CHUNKS)
+    assert 0.05 <= timings["ttft_s"] <= timings["total_s"]
+    assert client.requests == [{"model": "gpt-4o", "messages": []}]
+
+
+def test_renders_are_throttled():
+    client = MockChatClient(CHUNKS * 10, first_token_delay=0, chunk_delay=0)
+    rendered = []
+
+    text, _ = stream_chat_completion(client, on_text=rendered.append, min_interval=60)
+
+    # The first chunk renders immediately, the rest only in the final call
+    assert rendered == [CHUNKS[0], text]
+
+
+def test_second_identical_request_is_served_from_the_cache(tmp_path):
+    client = MockChatClient(CHUNKS, first_token_delay=0, chunk_delay=0)
+    cache = AnalysisCache(str(tmp_path))
+    key = cache.make_key("BTC-USD", "1h", ["Trend Analysis"], "stats", "levels", "gaps", "bars")
+
+    def analyze():
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        text, _ = stream_chat_completion(client, model="gpt-4o", messages=[])
+        cache.put(key, text)
+        return text
+
+    assert analyze() == analyze() == "".join(CHUNKS)
+    assert len(client.requests) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_empty_stream_has_no_ttft():
+    text, timings = stream_chat_completion(MockChatClient([], first_token_delay=0))
+    assert text == "" and timings["ttft_s"] is None and timings["chunks"] == 0
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import OpenGapIndex, fair_value_gap_table, first_at_or_below, track_gap_fills
+from benchmarks.synthetic import make_ohlcv
+from market_store import normalize_ohlcv
+
+
+@pytest.fixture
+def bars():
+    return normalize_ohlcv(make_ohlcv(3_000, seed=11))
+
+
+@pytest.mark.parametrize('block', [4, 16, 256])
+def test_first_at_or_below_matches_a_scan(block):
+    rng = np.random.default_rng(block)
+    values = rng.normal(0, 1, 2_000)
+    values[rng.choice(len(values), 50, replace=False)] = np.nan
+    starts = rng.integers(-5, len(values) + 5, 3_000)
+    thresholds = rng.normal(-1.5, 1, len(starts))
+
+    expected = []
+    for start, threshold in zip(starts, thresholds):
+        hits = [i for i in range(max(start, 0), len(values)) if values[i] <= threshold] if start >= 0 else []
+        expected.append(hits[0] if hits else len(values))
+    np.testing.assert_array_equal(first_at_or_below(values, starts, thresholds, block), expected)
+
+
+def test_gap_fills_match_a_scan(bars):
+    table = track_gap_fills(bars, fair_value_gap_table(bars))
+    high, low = bars['High'].to_numpy(), bars['Low'].to_numpy()
+    assert len(table) > 100
+    for gap in table.itertuples():
+        bullish = gap.type == 'bullish'
+        partial = fill = -1
+        deepest = np.inf if bullish else -np.inf
+        for i in range(gap.position + 2, len(bars)):
+            deepest = min(deepest, low[i]) if bullish else max(deepest, high[i])
+            entered = low[i] < gap.top if bullish else high[i] > gap.bottom
+            done = low[i] <= gap.bottom if bullish else high[i] >= gap.top
+            if entered and partial < 0:
+                partial = i
+            if done:
+                fill = i
+                break
+        status = 'filled' if fill >= 0 else 'partial' if partial >= 0 else 'open'
+        assert (gap.status, gap.partial_position, gap.fill_position) == (status, partial, fill)
+        if status == 'partial':
+            remaining = (gap.bottom, deepest) if bullish else (deepest, gap.top)
+        else:
+            remaining = (gap.bottom, gap.top)
+        assert (gap.remaining_bottom, gap.remaining_top) == remaining
+
+
+def test_open_gap_index_matches_a_scan():
+    rng = np.random.default_rng(0)
+    n = 1_000
+    # Overlapping ranges with repeated edges, so ties must stay oldest first
+    bottom = rng.integers(0, 400, n) / 4
+    top = bottom + rng.integers(0, 20, n) / 4
+    status = rng.choice(['open', 'partial', 'filled'], n)
+    table = pd.DataFrame({'position': np.arange(n), 'type': 'bullish', 'top': top + 1, 'bottom': bottom,
+                          'status': status, 'remaining_bottom': bottom, 'remaining_top': top})
+    index = OpenGapIndex(table)
+    gaps = table[status != 'filled'].reset_index(drop=True)
+    bottom, top = gaps['remaining_bottom'].to_numpy(), gaps['remaining_top'].to_numpy()
+    assert len(index) == len(gaps)
+
+    # Gap edges exactly, and prices in and around the range
+    prices = np.r_[bottom[:20], top[:20], rng.uniform(-5, 110, 200)]
+    for price in prices:
+        rows = np.flatnonzero((bottom <= price) & (price <= top))
+        pd.testing.assert_frame_equal(index.containing(price), gaps.iloc[rows])
+
+        high = price + rng.integers(0, 12) / 4
+        rows = np.flatnonzero((bottom <= high) & (top >= price))
+        pd.testing.assert_frame_equal(index.overlapping(price, high), gaps.iloc[rows])
+
+        distance = np.maximum(bottom - price, 0) + np.maximum(price - top, 0)
+        rows = np.argsort(distance, kind='stable')[:7]
+        pd.testing.assert_frame_equal(index.nearest(price, 7), gaps.iloc[rows])
+
+
+def test_open_gap_index_without_gaps(bars):
+    index = OpenGapIndex(fair_value_gap_table(bars.iloc[:2]))
+    assert len(index) == 0
+    assert index.containing(100.0).empty
+    assert index.overlapping(90.0, 110.0).empty
+    assert index.nearest(100.0).empty
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_ohlcv
+from live import LiveBars
+from market_store import normalize_ohlcv
+from resample import resample_ohlcv
+
+
+def baseline_stats(df, window):
+    """The market stats as the app computed them on the resampled frame"""
+    tail = df if window is None else df.iloc[-window:]
+    return {
+        'current_price': df['Close'].iloc[-1],
+        'price_change': (df['Close'].iloc[-1] / df['Close'].iloc[-2] - 1) * 100,
+        'high': tail['High'].max(),
+        'low': tail['Low'].min(),
+        'volume': tail['Volume'].sum(),
+    }
+
+
+def assert_matches(live, source, interval, window):
+    df = resample_ohlcv(source, interval)
+    stats = live.stats()
+    for name, value in baseline_stats(df, window).items():
+        assert stats[name] == pytest.approx(value, rel=1e-12), name
+    candle = live.candle()
+    assert candle.pop('time') == df.index[-1]
+    assert candle == pytest.approx(df.iloc[-1].to_dict(), rel=1e-12)
+
+
+@pytest.fixture
+def bars():
+    frame = normalize_ohlcv(make_ohlcv(3_000, seed=3))
+    rng = np.random.default_rng(3)
+    # Missing minutes, as in yfinance crypto data
+    return frame.drop(frame.index[rng.choice(np.arange(1, len(frame)), 40, replace=False)])
+
+
+@pytest.mark.parametrize('interval, window', [('5m', 24), ('60m', 24), ('60m', None)])
+def test_stats_match_the_resampled_frame(bars, interval, window):
+    base = bars.iloc[:2_000]
+    df = resample_ohlcv(base, interval)
+    step = pd.Timedelta(minutes=int(interval[:-1]))
+    live = LiveBars(base, window=window, bin_start=df.index[-1], step=step)
+    assert_matches(live, base, interval, window)
+
+    # Bars arriving after the cached frame, with revisions of the open bar
+    for i in range(2_000, len(bars)):
+        row = bars.iloc[i]
+        live.push_bar(bars.index[i], row['Open'], row['High'], row['Low'], row['Open'], row['Volume'] // 2)
+        live.push_bar(bars.index[i], *row.tolist())
+        if i % 97 == 0:
+            assert_matches(live, bars.iloc[:i + 1], interval, window)
+    assert_matches(live, bars, interval, window)
+
+
+def test_older_bars_are_ignored(bars):
+    live = LiveBars(bars, window=24)
+    before = live.stats()
+    assert not live.push_bar(bars.index[-2], 1.0, 1.0, 1.0, 1.0, 1)
+    assert live.stats() == before
@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_ohlcv
+from market_store import COMPACT_PRICE_LIMIT, MarketDataStore, compact_ohlcv, frame_nbytes, normalize_ohlcv
+
+
+class Source:
+    """Serves the first ``n`` bars of a frame like a provider download"""
+
+    def __init__(self, frame, n):
+        self.frame, self.n, self.starts = frame, n, []
+
+    def __call__(self, ticker, interval, period=None, start=None):
+        self.starts.append(start)
+        if start is None:
+            return self.frame.iloc[:self.n]
+        return self.frame.iloc[self.frame.index.searchsorted(start):self.n]
+
+
+def test_delta_refresh_appends_only_new_bars(tmp_path):
+    bars = normalize_ohlcv(make_ohlcv(1_050))
+    source = Source(bars, 1_000)
+    store = MarketDataStore(str(tmp_path))
+    store.fetch("SYN", "1m", None, source)
+    index_file = tmp_path / "SYN__1m" / "index.bin"
+    written = os.stat(index_file).st_mtime_ns, index_file.read_bytes()[:8_000]
+
+    for n in range(1_001, 1_051):
+        source.n = n
+        frame = store.fetch("SYN", "1m", None, source)
+        pd.testing.assert_frame_equal(frame, bars.iloc[:n], check_index_type=False)
+
+    # Only the tail was requested and rewritten; the head of the file is untouched
+    assert source.starts[-1] == bars.index[1_048]
+    assert index_file.read_bytes()[:8_000] == written[1]
+    assert os.path.getsize(index_file) == 8 * 1_050
+    reopened, meta = MarketDataStore(str(tmp_path)).load("SYN", "1m")
+    pd.testing.assert_frame_equal(reopened, bars, check_index_type=False)
+
+
+def test_uncommitted_rows_are_ignored(tmp_path):
+    bars = normalize_ohlcv(make_ohlcv(100))
+    store = MarketDataStore(str(tmp_path))
+    store.fetch("SYN", "1m", None, Source(bars, 100))
+    # An append that crashed before meta.json was replaced
+    with open(tmp_path / "SYN__1m" / "Close.bin", "ab") as f:
+        f.write(b"\0" * 80)
+
+    frame, meta = MarketDataStore(str(tmp_path)).load("SYN", "1m")
+    assert meta["rows"] == 100
+    pd.testing.assert_frame_equal(frame, bars, check_index_type=False)
+
+
+def test_max_rows_trims_bars_before_the_window(tmp_path):
+    now = pd.Timestamp.now(tz="UTC").floor("min")
+    bars = normalize_ohlcv(make_ohlcv(3_000, start=now - pd.Timedelta(minutes=2_999)))
+    store = MarketDataStore(str(tmp_path), max_rows=200)
+    frame = store.fetch("SYN", "1m", "1d", Source(bars, 3_000))
+
+    stored, meta = store.load("SYN", "1m")
+    assert len(stored) < 1_500
+    assert stored.index[0] <= frame.index[0] and stored.index[-1] == bars.index[-1]
+    assert meta["coverage_start"] == stored.index[0].value
+
+
+def test_compact_store_holds_one_float32_copy(tmp_path):
+    bars = normalize_ohlcv(make_ohlcv(7_200))
+    source = Source(bars, 7_000)
+    store = MarketDataStore(str(tmp_path), compact=True)
+    store.fetch("SYN", "1m", None, source)
+    source.n = 7_200
+    frame = store.fetch("SYN", "1m", None, source)
+
+    assert frame["Close"].dtype == np.float32 and store.holds(frame)
+    (held, full), = store.memory(frame_nbytes).values()
+    assert (held, full) == (230_400, 345_600)
+    pd.testing.assert_frame_equal(frame, compact_ohlcv(bars), check_index_type=False)
+    # The files keep the downloaded float64 prices
+    reopened, _ = MarketDataStore(str(tmp_path)).load("SYN", "1m")
+    pd.testing.assert_frame_equal(reopened, bars, check_index_type=False)
+
+
+def test_compact_keeps_float64_where_float32_loses_cents():
+    bars = normalize_ohlcv(make_ohlcv(100))
+    assert compact_ohlcv(bars)["Close"].dtype == np.float32
+    expensive = bars.assign(High=bars["High"] + COMPACT_PRICE_LIMIT)
+    assert compact_ohlcv(expensive) is expensive
+
+
+def test_frames_in_memory_are_bounded(tmp_path):
+    bars = normalize_ohlcv(make_ohlcv(100))
+    store = MarketDataStore(str(tmp_path), max_frames=2)
+    for symbol in ["A", "B", "C"]:
+        store.fetch(symbol, "1m", None, Source(bars, 100))
+    store.load("B", "1m")
+    store.fetch("D", "1m", None, Source(bars, 100))
+    assert list(store.memory(len)) == [("B", "1m"), ("D", "1m")]
+    # Evicted keys are read back from the files
+    frame, _ = store.load("A", "1m")
+    pd.testing.assert_frame_equal(frame, bars, check_index_type=False)
+
+
+def test_max_rows_per_interval(tmp_path):
+    now = pd.Timestamp.now(tz="UTC").floor("min")
+    bars = normalize_ohlcv(make_ohlcv(3_000, start=now - pd.Timedelta(minutes=2_999)))
+    store = MarketDataStore(str(tmp_path), max_rows={"1m": 200})
+    store.fetch("SYN", "1m", "1d", Source(bars, 3_000))
+    store.fetch("SYN", "5m", "1d", Source(bars, 3_000))
+
+    assert len(store.load("SYN", "1m")[0]) < 1_500
+    assert len(store.load("SYN", "5m")[0]) == 3_000
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_ohlcv
+from market_store import normalize_ohlcv
+from resample import bin_grid, resample_ohlcv, session_offset
+
+
+def test_missing_minutes_keep_clock_aligned_bins():
+    bars = normalize_ohlcv(make_ohlcv(3_000))
+    rng = np.random.default_rng(1)
+    bars = bars.drop(bars.index[rng.choice(np.arange(1, len(bars)), 60, replace=False)])
+
+    assert session_offset(bars.index, 5) == pd.Timedelta(0)
+    assert (resample_ohlcv(bars, "5m").index.minute % 5 == 0).all()
+    assert (resample_ohlcv(bars, "60m").index.minute == 0).all()
+
+
+def test_bins_align_to_the_session_open():
+    days = pd.date_range("2024-01-01", periods=5, freq="D", tz="UTC")
+    index = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(day + pd.Timedelta(hours=14, minutes=30), periods=390, freq="1min")
+        for day in days
+    ]))
+
+    assert session_offset(index, 60) == pd.Timedelta(minutes=30)
+    assert session_offset(index, 5) == pd.Timedelta(0)
+
+
+def test_bin_grid_matches_the_resampled_bins():
+    bars = normalize_ohlcv(make_ohlcv(3_000))
+    for interval in ["5m", "15m", "60m"]:
+        bin_start, step = bin_grid(bars.index, interval)
+        assert ((resample_ohlcv(bars, interval).index - bin_start) % step == pd.Timedelta(0)).all()
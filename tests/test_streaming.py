@@ -0,0 +1,113 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_stream import expected_bars, make_ticks
+from benchmarks.synthetic import make_ohlcv
+from indicators import INDICATOR_COLUMNS, compute_indicators
+from market_store import normalize_ohlcv
+from resample import resample_ohlcv
+from streaming import BarStream, FileReplayFeed, StreamHub, SyntheticTickFeed
+
+
+@pytest.fixture
+def base():
+    return normalize_ohlcv(make_ohlcv(2_000, seed=5))
+
+
+def replay(tmp_path, base, n_ticks=5_000, minutes=300):
+    """A seeded tape of trades after ``base`` and the bars it adds, aggregated with pandas"""
+    ticks = make_ticks(base.index[-1] + pd.Timedelta(minutes=1), n_ticks, minutes, seed=5,
+                       price=float(base['Close'].iloc[-1]))
+    ticks.to_parquet(tmp_path / 'SYN_ticks.parquet')
+    bars = expected_bars(ticks, '1min')
+    bars.index = bars.index.as_unit(base.index.unit)
+    return pd.concat([base, bars.astype(base.dtypes.to_dict())])
+
+
+def test_replayed_trades_match_the_resampled_frame(tmp_path, base):
+    full = replay(tmp_path, base)
+    stream = BarStream(base, '1m', display='5m', window=24)
+    feed = FileReplayFeed(str(tmp_path), speed=0, shift_to_now=False)
+    feed.subscribe('SYN', stream.on_tick)
+    feed.start().join()
+
+    assert stream.ticks == 5_000 and stream.late_ticks == 0
+    # Only the bars the 24 five-minute candles reach are held
+    assert len(stream._closed) == stream.max_bars == 120
+
+    df = resample_ohlcv(full, '5m')
+    stats = stream.stats()
+    tail = df.iloc[-24:]
+    assert stats['current_price'] == pytest.approx(df['Close'].iloc[-1], rel=1e-12)
+    assert stats['price_change'] == pytest.approx((df['Close'].iloc[-1] / df['Close'].iloc[-2] - 1) * 100,
+                                                  rel=1e-9)
+    assert stats['high'] == pytest.approx(tail['High'].max(), rel=1e-12)
+    assert stats['low'] == pytest.approx(tail['Low'].min(), rel=1e-12)
+    assert stats['volume'] == tail['Volume'].sum()
+    assert stream.candle()['time'] == df.index[-1]
+
+    # Indicators follow the display candles, the open one included
+    expected = compute_indicators(df['Close']).iloc[-1]
+    values = stream.indicators()
+    for column in INDICATOR_COLUMNS:
+        assert values[column] == pytest.approx(expected[column], rel=1e-9, abs=1e-12), column
+
+    # A refreshed cached frame fills in what the stream no longer holds
+    cached = full.iloc[:-40]
+    pd.testing.assert_frame_equal(stream.frame(cached), full, check_freq=False)
+    assert stream.frame(cached) is stream.frame(cached)
+
+
+def test_trades_before_the_open_bar_are_late(base):
+    stream = BarStream(base, '1m')
+    before = stream.stats()
+    stream.on_tick(base.index[-2].value, 1.0, 10)
+    assert stream.late_ticks == 1 and stream.ticks == 0
+    assert stream.stats() == before
+
+
+def test_feed_restart_reseeds_from_the_store(base):
+    # Bars ending now, so the feed's wall-clock trades land in the open bar
+    now = pd.Timestamp.now(tz='UTC').floor('min')
+    frame = base.set_axis(base.index + (now - base.index[-1]))
+    reloaded = frame.iloc[:-1]
+    feed = SyntheticTickFeed(seed=1, rate=500)
+    hub = StreamHub(feed)
+    stream = hub.get('SYN', 'SYN', '1m', frame, reload=lambda: reloaded)
+    try:
+        deadline = time.monotonic() + 5
+        while stream.ticks == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert stream.ticks > 0 and stream.reseeds == 0
+
+        feed.stop()
+        feed.start()
+        deadline = time.monotonic() + 5
+        while stream.reseeds == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert stream.reseeds == 1 and feed.reset_errors == 0
+        assert stream.frame().index[0] == reloaded.index[0]
+        assert np.isfinite(stream.stats()['current_price'])
+    finally:
+        feed.stop()
+
+
+def test_idle_streams_are_released(base):
+    feed = SyntheticTickFeed(seed=2, rate=50)
+    hub = StreamHub(feed, idle_timeout=60)
+    try:
+        first = hub.get('a', 'AAA', '1m', base)
+        hub.get('b', 'BBB', '1m', base)
+        assert hub.get('a', 'AAA', '1m', base) is first and len(hub) == 2
+
+        hub.idle_timeout = 0
+        time.sleep(0.01)
+        hub.get('c', 'CCC', '1m', base)
+        assert len(hub) == 1 and feed.symbols() == ['CCC']
+        # Released for good: the next request seeds a new stream
+        assert hub.get('a', 'AAA', '1m', base) is not first
+    finally:
+        feed.stop()